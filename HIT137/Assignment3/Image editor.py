@@ -1,12 +1,59 @@
+import argparse # for the profiling options
 import cv2 # OpenCV for image processing
 import tkinter as tk # GUI framework
 from tkinter import filedialog, messagebox, Frame, Label, Button, Scale
 from PIL import Image, ImageTk #  for handling images
 import numpy as np # for numerical operations
+from concurrent.futures import ThreadPoolExecutor # for rendering resize previews off the Tk main loop
+from edit_history import EditHistory, DEFAULT_BUDGET # memory-bounded undo/redo
+from image_ops import fit_size, resize_op # edits are kept as operations and rendered lazily
+from large_image import open_image # memory-maps images too large to keep in memory
+from instrumentation import Profiler, profiled # opt-in timing of the action handlers
+
+PREVIEW_SIZE = 500 # Largest width/height shown on the canvases
+PREVIEW_DELAY = 30 # Milliseconds the resize slider must rest before its preview is rendered
+PREVIEW_POLL = 15 # Milliseconds between checks for a finished background preview
+FRAME_TIME = 16 # Milliseconds between crop selection redraws (about 60 per second)
+
+
+def downsample(image, max_size=PREVIEW_SIZE):
+    """Shrinks a BGR image to fit within max_size x max_size; smaller images are returned as they are."""
+    height, width = image.shape[:2]
+    size = fit_size(width, height, max_size)
+    if size != (width, height):
+        # INTER_AREA averages the source pixels, so the preview looks like a proper thumbnail
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return image
+
+
+def to_pil(image):
+    """Converts a BGR image to an RGB PIL image."""
+    return Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+
+def make_preview(image, max_size=PREVIEW_SIZE):
+    """Downsamples a BGR image to fit within max_size x max_size, then converts only the small copy to a PIL image."""
+    return to_pil(downsample(image, max_size))
+
+
+def resize_preview(small, full_shape, scale, max_size=PREVIEW_SIZE):
+    """
+    Renders what the image would look like resized by scale, starting from its display-size copy.
+
+    The result is shown at most max_size wide or high anyway, so resizing the full-resolution image
+    first would only be thrown away. Runs in a worker thread (OpenCV releases the GIL).
+
+    Returns:
+        tuple: (PIL image to display, (height, width) of the resized full-resolution image).
+    """
+    height, width = full_shape[:2]
+    new_width, new_height = max(1, int(width * scale)), max(1, int(height * scale))
+    resized = cv2.resize(small, fit_size(new_width, new_height, max_size))
+    return to_pil(resized), (new_height, new_width)
 
 
 class ImageEditor:
-    def __init__(self, root):
+    def __init__(self, root, history_budget=DEFAULT_BUDGET, profile=False, trace_path=None):
         self.root = root
         self.root.title("Chitra Image Editor")
         self.root.geometry("1200x800")
@@ -17,16 +64,29 @@ class ImageEditor:
 
         # Image Attributes
         self.original_image = None # Stores original image
-        self.modified_image = None # Stores edited image
-        self.history = [] # Stores edit history for undo
-        self.redo_stack = [] # Stores redo actions
+        self.original_preview = None # Cached display-size copy of the original image
+        self.modified_small = None # Display-size render of the edited image
+        self.modified_preview = None # The same render as an RGB PIL image, as shown on the canvas
+        self.history = EditHistory(history_budget) # Stores edit history for undo and redo actions
+        self.current_state = None # Edited image, kept as the original plus a chain of operations
         self.crop_mode = False # Crop mode flag
         self.start_x = self.start_y = self.end_x = self.end_y = 0 # Crop coordinates
+        self.crop_job = None # Pending redraw of the crop selection
 
         # Scaling factors for the resizing
         self.scale_x = 1.0  # Horizontal scaling factor
         self.scale_y = 1.0  # Vertical scaling factor
 
+        # Resize preview state: pending after() job, background render and the slider value last rendered
+        self.preview_worker = ThreadPoolExecutor(max_workers=1)
+        self.preview_job = None
+        self.preview_future = None
+        self.preview_value = None
+
+        # Per-action timings, only collected when profiling is turned on
+        self.profiler = Profiler(profile or trace_path is not None, trace_path, self.show_status)
+        self.status_bar = None
+
         # This creates the UI Elements
         self.create_gui()
         self.bind_shortcuts()
@@ -35,6 +95,12 @@ class ImageEditor:
         Label(self.root, text="Made with ❤️ by Hadi, Akhil, Athira, Susan", fg='white', bg='#2D2D2D',
               font=('Segoe UI', 10)).pack(side=tk.BOTTOM, pady=10)
 
+        # Status bar with the rolling profiling summary
+        if self.profiler.enabled:
+            self.status_bar = Label(self.root, text=self.profiler.summary(), anchor="w", fg='white', bg='#2D2D2D',
+                                    font=('Segoe UI', 9))
+            self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+
     def create_gui(self):
         """Creates the main GUI layout."""
         main_frame = Frame(self.root, bg='#ADD8E6')
@@ -88,7 +154,7 @@ class ImageEditor:
 
         # For resizing the image
         self.resize_scale = Scale(control_frame, from_=10, to=200, orient=tk.HORIZONTAL, label="Resize (%) ",
-                                  bg='#B0E0E6')
+                                  bg='#B0E0E6', command=lambda value: self.preview_resize())
         self.resize_scale.set(100)
         self.resize_scale.pack(pady=10)
         self.resize_scale.bind("<Motion>", self.preview_resize)
@@ -99,80 +165,117 @@ class ImageEditor:
         self.root.bind("<Control-y>", lambda e: self.redo())
         self.root.bind("<Control-s>", lambda e: self.save_image())
 
+    def show_status(self, text):
+        """Shows the profiling summary in the status bar."""
+        if self.status_bar is not None:
+            self.status_bar.config(text=text)
+
     def load_image(self):
         """This will load an image from the file system."""
         file_path = filedialog.askopenfilename()
         if not file_path:
             return
+        self.open_file(file_path)
+
+    @profiled("Load")
+    def open_file(self, file_path):
+        """Loads file_path as the original image and shows it."""
         try:
-            self.original_image = cv2.imread(file_path)
+            with self.profiler.stage("decode"):
+                self.original_image, reduced = open_image(file_path, PREVIEW_SIZE)
             if self.original_image is None:
                 raise ValueError("Failed to load image.")
-            self.modified_image = self.original_image.copy()
-            self.history = [self.modified_image.copy()]
-            self.redo_stack = []
-            self.show_images()
+            with self.profiler.stage("operation"):
+                self.current_state = self.history.reset(self.original_image, reduced)
+            # Large images come with a copy decoded at reduced size, so the preview never reads every pixel
+            with self.profiler.stage("color conversion"):
+                self.original_preview = make_preview(reduced[1] if reduced else self.original_image)
+            self.show_images(refresh_original=True)
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
-    def show_images(self):
+    def show_images(self, refresh_original=False):
         """This displays the loaded images on the canvas."""
-        if self.original_image is not None:
-            self.display_image(self.original_image, self.original_canvas)
-        if self.modified_image is not None:
-            self.display_image(self.modified_image, self.modified_canvas)
-
-    def display_image(self, image, canvas):
+        # The original never changes after loading, so edits only redraw the modified canvas
+        if refresh_original and self.original_image is not None:
+            self.display_image(self.original_image, self.original_canvas, self.original_preview)
+        if self.current_state is not None:
+            # Only a display-size copy of the edited image is computed; see save_image for full resolution
+            with self.profiler.stage("render"):
+                self.modified_small = self.current_state.render(PREVIEW_SIZE)
+            self.preview_value = None  # The next slider move previews the new image
+            with self.profiler.stage("color conversion"):
+                self.modified_preview = to_pil(self.modified_small)
+            self.draw_preview(self.modified_preview, self.current_state.shape, self.modified_canvas)
+
+    @profiled("Display")
+    def display_image(self, image, canvas, preview=None):
         """Displays an image on the given canvas after resizing it."""
-        img = cv2.cvtColor(image, cv2.COLOR_BGR2RGB) # for converting the color format
-        img = Image.fromarray(img)
-        original_width, original_height = img.size
+        # Shrink to fit within 500x500 while maintaining aspect ratio before converting the color format
+        img = preview if preview is not None else make_preview(image)
+        self.draw_preview(img, image.shape[:2], canvas)
 
-        # Resize image to fit within 500x500 while maintaining aspect ratio to fit canvas
-        img.thumbnail((500, 500)) 
+    def draw_preview(self, img, full_shape, canvas):
+        """Puts a display-size PIL image on the canvas; full_shape is the (height, width) it stands for."""
+        original_height, original_width = full_shape[:2]
         resized_width, resized_height = img.size
 
         # Calculate scaling factors
         self.scale_x = original_width / resized_width
         self.scale_y = original_height / resized_height
 
-        img_tk = ImageTk.PhotoImage(img)
-        canvas.config(width=resized_width, height=resized_height)  # Adjust canvas size dynamically
-        canvas.create_image(0, 0, anchor=tk.NW, image=img_tk)
+        with self.profiler.stage("PhotoImage"):
+            img_tk = ImageTk.PhotoImage(img)
+        with self.profiler.stage("canvas"):
+            canvas.config(width=resized_width, height=resized_height)  # Adjust canvas size dynamically
+            canvas.delete("image")  # Drop the previous picture instead of stacking items on the canvas
+            canvas.create_image(0, 0, anchor=tk.NW, image=img_tk, tags="image")
+            canvas.tag_lower("image")  # Keep the crop rectangle above the picture
         canvas.image = img_tk
 
     def save_image(self):
         """Saves the modified image to a file."""
-        if self.modified_image is not None:
+        if self.current_state is not None:
             file_path = filedialog.asksaveasfilename(defaultextension=".png",
                                                      filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpg")])
             if file_path:
-                cv2.imwrite(file_path, self.modified_image)
+                self.write_file(file_path)
                 messagebox.showinfo("Success", "Image saved successfully!")
 
+    @profiled("Save")
+    def write_file(self, file_path):
+        """Renders the edited image at full resolution and writes it to file_path."""
+        with self.profiler.stage("encode"):
+            self.current_state.save(file_path)  # The only full-resolution render
+
+    @profiled("Undo")
     def undo(self): #jumps into the previous action
-        if len(self.history) > 1:
-            self.redo_stack.append(self.history.pop())
-            self.modified_image = self.history[-1].copy()
+        state = self.history.undo()
+        if state is not None:
+            self.current_state = state
             self.show_images()
 
+    @profiled("Redo")
     def redo(self): #redo the action
-        if self.redo_stack:
-            self.history.append(self.modified_image.copy())  # Save current state before redoing
-            self.modified_image = self.redo_stack.pop()
+        state = self.history.redo(self.current_state)  # Save current state before redoing
+        if state is not None:
+            self.current_state = state
             self.show_images()
 
+    @profiled("Grayscale")
     def apply_grayscale(self): #for applying grayscale effect in the image
-        if self.modified_image is not None:
-            self.history.append(self.modified_image.copy())
-            gray = cv2.cvtColor(self.modified_image, cv2.COLOR_BGR2GRAY)
-            self.modified_image = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        if self.current_state is not None:
+            with self.profiler.stage("operation"):
+                self.history.record(self.current_state)
+                self.current_state = self.current_state.derive("grayscale")
             self.show_images()
 
+    @profiled("Rotate")
     def rotate_image(self): # for rotating the image by 90 degree
-        if self.modified_image is not None:
-            self.history.append(self.modified_image.copy())
-            self.modified_image = cv2.rotate(self.modified_image, cv2.ROTATE_90_CLOCKWISE)
+        if self.current_state is not None:
+            with self.profiler.stage("operation"):
+                self.history.record(self.current_state)
+                self.current_state = self.current_state.derive("rotate")
             self.show_images()
 
     def enable_crop_mode(self): # for cropping the image 
@@ -181,39 +284,55 @@ class ImageEditor:
     def start_crop(self, event):
         if self.crop_mode:
             self.start_x, self.start_y = event.x, event.y
+            # One selection rectangle per drag; motion events only move it
+            self.modified_canvas.delete("crop_rect")
+            self.modified_canvas.create_rectangle(self.start_x, self.start_y, self.start_x, self.start_y,
+                                                  outline="red", tags="crop_rect")
 
     def draw_crop_rectangle(self, event):
         if self.crop_mode:
-            self.modified_canvas.delete("crop_rect")
             self.end_x, self.end_y = event.x, event.y
-            self.modified_canvas.create_rectangle(self.start_x, self.start_y, self.end_x, self.end_y, outline="red",
-                                                  tags="crop_rect")
+            # Mouse events can arrive far faster than the screen refreshes, so redraw at most once a frame
+            if self.crop_job is None:
+                self.crop_job = self.root.after(FRAME_TIME, self.update_crop_selection)
+
+    @profiled("Crop drag")
+    def update_crop_selection(self):
+        """Moves the selection rectangle to the latest mouse position and refreshes the thumbnail."""
+        self.crop_job = None
+        if not self.crop_mode:
+            return
+        self.modified_canvas.coords("crop_rect", self.start_x, self.start_y, self.end_x, self.end_y)
 
-            #This displays temporary thumbnail of the cropped area
-            try:
-                x1, y1 = int(self.start_x * self.scale_x), int(self.start_y * self.scale_y)
-                x2, y2 = int(self.end_x * self.scale_x), int(self.end_y * self.scale_y)
-                x1, x2 = sorted([x1, x2])
-                y1, y2 = sorted([y1, y2])
-
-                if x1 != x2 and y1 != y2:  # Ensure valid crop area
-                    cropped = self.modified_image[y1:y2, x1:x2]
-                    cropped = cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB)
-                    cropped = Image.fromarray(cropped)
+        #This displays temporary thumbnail of the cropped area
+        try:
+            # Cut from the RGB display-size render, which canvas coordinates index directly
+            width, height = self.modified_preview.size
+            x1, x2 = sorted([min(max(self.start_x, 0), width), min(max(self.end_x, 0), width)])
+            y1, y2 = sorted([min(max(self.start_y, 0), height), min(max(self.end_y, 0), height)])
+
+            if x1 != x2 and y1 != y2:  # Ensure valid crop area
+                with self.profiler.stage("thumbnail"):
+                    cropped = self.modified_preview.crop((x1, y1, x2, y2))
                     cropped.thumbnail((100, 100))  # Create a small thumbnail
+                with self.profiler.stage("PhotoImage"):
                     cropped_tk = ImageTk.PhotoImage(cropped)
 
-                    # Displays the thumbnail in a popup or overlay
-                    if not hasattr(self, "thumbnail_label"):
-                        self.thumbnail_label = Label(self.root, bg="white")
-                        self.thumbnail_label.place(x=10, y=10)  # Position the thumbnail
-                    self.thumbnail_label.config(image=cropped_tk)
-                    self.thumbnail_label.image = cropped_tk
-            except Exception as e:
-                pass  #This ignores errors during thumbnail creation
+                # Displays the thumbnail in a popup or overlay
+                if not hasattr(self, "thumbnail_label"):
+                    self.thumbnail_label = Label(self.root, bg="white")
+                    self.thumbnail_label.place(x=10, y=10)  # Position the thumbnail
+                self.thumbnail_label.config(image=cropped_tk)
+                self.thumbnail_label.image = cropped_tk
+        except Exception as e:
+            pass  #This ignores errors during thumbnail creation
 
+    @profiled("Crop")
     def end_crop(self, event):
         if self.crop_mode:
+            if self.crop_job is not None:
+                self.root.after_cancel(self.crop_job)
+                self.update_crop_selection()  # Show where the drag really ended
             self.crop_mode = False
             x1, y1 = int(self.start_x * self.scale_x), int(self.start_y * self.scale_y)
             x2, y2 = int(self.end_x * self.scale_x), int(self.end_y * self.scale_y)
@@ -229,35 +348,59 @@ class ImageEditor:
 
             # Crop the image
             try:
-                self.history.append(self.modified_image.copy())
-                self.modified_image = self.modified_image[y1:y2, x1:x2]
+                with self.profiler.stage("operation"):
+                    cropped = self.current_state.derive(("crop", x1, y1, x2, y2))
+                    cropped.shape  # Raises if the area lies outside the image
+                    self.history.record(self.current_state)
+                    self.current_state = cropped
                 self.modified_canvas.delete("crop_rect")  # Remove selection box
                 self.show_images()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to crop image: {str(e)}")
     #For the resizing of image
-    def preview_resize(self, event):
-        if self.modified_image is not None:
-            scale = self.resize_scale.get() / 100.0
-            h, w = self.modified_image.shape[:2]
-            new_size = (int(w * scale), int(h * scale))
-            resized = cv2.resize(self.modified_image, new_size)
-            self.display_image(resized, self.modified_canvas)
-
+    def preview_resize(self, event=None):
+        """Schedules a resize preview; a burst of slider events is collapsed into one render of the latest value."""
+        if self.current_state is not None:
+            if self.preview_job is not None:
+                self.root.after_cancel(self.preview_job)
+            self.preview_job = self.root.after(PREVIEW_DELAY, self.start_preview)
+
+    def start_preview(self):
+        """Hands the latest slider value to the background worker, unless it is already shown or being rendered."""
+        self.preview_job = None
+        if self.current_state is None or self.preview_future is not None:
+            return  # The running render checks the slider again when it finishes
+        value = self.resize_scale.get()
+        if value == self.preview_value:
+            return
+        self.preview_value = value
+        small = self.modified_small
+        self.preview_future = self.preview_worker.submit(resize_preview, small, self.current_state.shape,
+                                                         value / 100.0)
+        self.root.after(PREVIEW_POLL, self.finish_preview, small)
+
+    def finish_preview(self, small):
+        """Shows a finished background preview on the main thread (Tk is not thread-safe)."""
+        if not self.preview_future.done():
+            self.root.after(PREVIEW_POLL, self.finish_preview, small)
+            return
+        future, self.preview_future = self.preview_future, None
+        if small is not self.modified_small:
+            return  # The image was edited meanwhile, so this preview is stale
+        img, full_shape = future.result()
+        with self.profiler.action("Resize preview"):
+            self.draw_preview(img, full_shape, self.modified_canvas)
+        self.start_preview()  # Catch up if the slider moved while rendering
+
+    @profiled("Resize")
     def confirm_resize(self):
-        if self.modified_image is not None:
+        if self.current_state is not None:
             scale = self.resize_scale.get() / 100.0
-            h, w = self.modified_image.shape[:2]
-            new_size = (int(w * scale), int(h * scale))
 
-            # Use different interpolation methods based on scale
-            if scale < 0.5:
-                resized = cv2.resize(self.modified_image, new_size, interpolation=cv2.INTER_NEAREST)  # Low-quality
-            else:
-                resized = cv2.resize(self.modified_image, new_size, interpolation=cv2.INTER_LINEAR)  # Higher-quality
-
-            self.history.append(self.modified_image.copy())
-            self.modified_image = resized
+            # Uses different interpolation methods based on scale (nearest below 50%, bilinear above)
+            with self.profiler.stage("operation"):
+                self.history.record(self.current_state)
+                self.current_state = self.current_state.derive(resize_op(self.current_state.shape, scale))
             self.show_images()
 
     def on_closing(self):
@@ -275,6 +418,8 @@ class ImageEditor:
 
         def close_app(): 
             satisfaction_popup.destroy()
+            self.preview_worker.shutdown(wait=False)
+            self.profiler.close()  # Finishes the timing trace, if one was asked for
             self.root.quit()
 
         Button(satisfaction_popup, text="😊 Happy", font=('Segoe UI', 12),
@@ -286,6 +431,12 @@ class ImageEditor:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chitra Image Editor")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every action and show a rolling summary in a status bar")
+    parser.add_argument("--trace", help="profile and write every timing to this .json or .csv file as the editor runs")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = ImageEditor(root)
+    app = ImageEditor(root, profile=args.profile, trace_path=args.trace)
     root.mainloop() # Starts the application
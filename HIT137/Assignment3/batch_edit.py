@@ -0,0 +1,169 @@
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import cv2 # OpenCV for image processing
+import numpy as np # for numerical operations
+from image_ops import recipe_ops, render
+
+# File types OpenCV can read and write
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+IO_THREADS = 4 # Threads reading and writing files while the worker processes decode, edit and encode
+
+
+def parse_step(text):
+    """
+    Parses one edit of a recipe: "grayscale", "rotate", "crop:X1,Y1,X2,Y2" or "resize:PERCENT".
+
+    Raises:
+        argparse.ArgumentTypeError: If the edit is not understood.
+    """
+    name, _, value = text.partition(":")
+    name = name.strip().lower()
+    try:
+        if name in ("grayscale", "rotate") and not value:
+            return name
+        if name == "crop":
+            x1, y1, x2, y2 = (int(part) for part in value.split(","))
+            x1, x2 = sorted([x1, x2])
+            y1, y2 = sorted([y1, y2])
+            if x1 == x2 or y1 == y2:
+                raise ValueError
+            return ("crop", x1, y1, x2, y2)
+        if name == "resize":
+            percent = float(value.rstrip("%"))
+            if percent <= 0:
+                raise ValueError
+            return ("scale", percent / 100.0)
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(
+        f"invalid edit '{text}' (use grayscale, rotate, crop:X1,Y1,X2,Y2 or resize:PERCENT)")
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def write_file(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+def process_image(data, recipe, extension):
+    """
+    Decodes an image, applies the recipe and encodes the result (runs in a worker process).
+
+    Returns:
+        tuple: (encoded bytes, number of source pixels).
+    """
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Failed to load image.")
+    result = render(image, recipe_ops(image.shape, recipe))
+    ok, encoded = cv2.imencode(extension, result)
+    if not ok:
+        raise ValueError(f"Cannot encode the result as {extension}.")
+    return encoded.tobytes(), image.shape[0] * image.shape[1]
+
+
+def run_batch(jobs, recipe, workers=None, window=None):
+    """
+    Applies a recipe to every (input path, output path) pair.
+
+    Reading and writing happen on a thread pool and decoding, editing and encoding on a process
+    pool, so while one image is being edited others are being read or written. At most window
+    images are in flight at once, which bounds memory however many files there are.
+
+    Returns:
+        dict: Counts and totals for the throughput report.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or 2 * workers
+    jobs = iter(jobs)
+    stats = {"done": 0, "failed": 0, "pixels": 0, "read": 0, "written": 0}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool, ThreadPoolExecutor(max_workers=IO_THREADS) as io:
+        active = {} # future -> (stage, input path, output path)
+
+        def start_reads():
+            while len(active) < window:
+                job = next(jobs, None)
+                if job is None:
+                    return
+                active[io.submit(read_file, job[0])] = ("read",) + job
+
+        start_reads()
+        while active:
+            done, _ = wait(active, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, source, target = active.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error processing '{source}': {e}")
+                    stats["failed"] += 1
+                    continue
+                if stage == "read":
+                    stats["read"] += len(result)
+                    extension = os.path.splitext(target)[1]
+                    active[pool.submit(process_image, result, recipe, extension)] = ("process", source, target)
+                elif stage == "process":
+                    encoded, pixels = result
+                    stats["pixels"] += pixels
+                    active[io.submit(write_file, target, encoded)] = ("write", source, target)
+                else:
+                    stats["written"] += result
+                    stats["done"] += 1
+            start_reads()
+    return stats
+
+
+def batch_jobs(input_folder, output_folder, extension=None):
+    """Pairs every image in input_folder with its path in output_folder (optionally with a new extension)."""
+    jobs = []
+    for file in sorted(os.listdir(input_folder)):
+        name, ext = os.path.splitext(file)
+        if ext.lower() in IMAGE_EXTENSIONS:
+            jobs.append((os.path.join(input_folder, file), os.path.join(output_folder, name + (extension or ext))))
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply the Image editor's edits to every image in a folder.")
+    parser.add_argument("input", help="folder holding the images")
+    parser.add_argument("output", help="folder to write the edited images to (created if needed)")
+    parser.add_argument("--op", dest="recipe", action="append", type=parse_step, required=True, metavar="EDIT",
+                        help="edit to apply, in order; repeat for several: grayscale, rotate (90 degrees clockwise), "
+                             "crop:X1,Y1,X2,Y2 or resize:PERCENT")
+    parser.add_argument("--format", choices=[ext.lstrip(".") for ext in IMAGE_EXTENSIONS],
+                        help="save as this file type instead of the input's")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input):
+        print(f"Error: Input folder '{args.input}' does not exist.")
+        return
+    if os.path.abspath(args.input) == os.path.abspath(args.output):
+        print("Error: The output folder must differ from the input folder.")
+        return
+    os.makedirs(args.output, exist_ok=True)
+    jobs = batch_jobs(args.input, args.output, "." + args.format if args.format else None)
+    if not jobs:
+        print(f"No images found in '{args.input}'.")
+        return
+
+    start = time.perf_counter()
+    stats = run_batch(jobs, args.recipe, args.workers or None)
+    seconds = max(time.perf_counter() - start, 1e-9)
+    print(f"Edited {stats['done']} of {len(jobs)} images in {seconds:.2f} s "
+          f"({stats['done'] / seconds:.1f} images/s, {stats['pixels'] / seconds / 1e6:.1f} megapixels/s, "
+          f"read {stats['read'] / seconds / 2 ** 20:.1f} MB/s, wrote {stats['written'] / seconds / 2 ** 20:.1f} MB/s)")
+    if stats["failed"]:
+        print(f"{stats['failed']} image(s) failed.")
+
+
+if __name__ == "__main__":
+    main()
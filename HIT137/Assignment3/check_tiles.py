@@ -0,0 +1,78 @@
+import argparse
+import random
+import sys
+import cv2 # OpenCV for image processing
+import numpy as np # for numerical operations
+from image_ops import output_shape, plan, recipe_ops, render, render_tiles
+
+# Largest difference allowed per interpolation: remap's bilinear weights are coarser than resize's
+TOLERANCE = {"nearest": 0, "bilinear": 1}
+
+
+def random_recipe(rng, width, height):
+    """A random list of edits in the form recipe_ops takes, for a width x height image."""
+    recipe = []
+    for _ in range(rng.randrange(1, 6)):
+        step = rng.choice(["rotate", "grayscale", "crop", "crop", "scale"])
+        if step == "rotate":
+            recipe.append("rotate")
+            width, height = height, width
+        elif step == "grayscale":
+            recipe.append("grayscale")
+        elif step == "crop" and width > 2 and height > 2:
+            x1, y1 = rng.randrange(width - 1), rng.randrange(height - 1)
+            x2, y2 = rng.randrange(x1 + 1, width + 1), rng.randrange(y1 + 1, height + 1)
+            recipe.append(("crop", x1, y1, x2, y2))
+            width, height = x2 - x1, y2 - y1
+        elif step == "scale":
+            factor = rng.choice([0.2, 0.3, 0.45, 0.7, 1.5, 2.3])
+            recipe.append(("scale", factor))
+            width, height = max(1, int(width * factor)), max(1, int(height * factor))
+    return recipe
+
+
+def check(cases, seed=0):
+    """
+    Renders random edit chains with render_tiles and with render and compares the pixels.
+
+    Returns:
+        dict: Largest difference seen for each interpolation, and the first failing case or None.
+    """
+    rng = random.Random(seed)
+    worst = dict.fromkeys(TOLERANCE, 0)
+    for case in range(cases):
+        height, width = rng.randrange(5, 120), rng.randrange(5, 120)
+        # Noise is the hardest content: any shift of the sampling positions shows up
+        image = np.random.RandomState(case).randint(0, 256, (height, width, 3), dtype=np.uint8)
+        recipe = random_recipe(rng, width, height)
+        ops = recipe_ops(image.shape, recipe)
+        expected = render(image, ops)
+        tiled = np.zeros(output_shape(image.shape, ops) + (3,), dtype=np.uint8)
+        render_tiles(image, ops, tiled, tile_size=rng.choice([1, 3, 16, 64]))
+
+        # All resizes are folded into one, done with the interpolation of the last
+        kind = "nearest" if plan(image.shape, ops).interpolation == cv2.INTER_NEAREST else "bilinear"
+        difference = int(np.abs(tiled.astype(np.int16) - expected).max())
+        worst[kind] = max(worst[kind], difference)
+        if difference > TOLERANCE[kind]:
+            return worst, (case, (width, height), recipe, difference)
+    return worst, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that tiled saves of large images match the editor's render.")
+    parser.add_argument("--cases", type=int, default=2000, help="random edit chains to try (default 2000)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random edit chains")
+    args = parser.parse_args()
+
+    worst, failure = check(args.cases, args.seed)
+    print(f"Largest difference: {worst['nearest']} (nearest-neighbour), {worst['bilinear']} (bilinear)")
+    if failure is not None:
+        case, size, recipe, difference = failure
+        print(f"Case {case}: {size[0]}x{size[1]} image, edits {recipe} differ by {difference} levels.")
+        sys.exit(1)
+    print(f"All {args.cases} edit chains match.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import collections
+import itertools
+import zlib
+import numpy as np # for numerical operations
+from image_ops import Pyramid, derive, output_shape, render
+from large_image import write_image
+
+DEFAULT_BUDGET = 512 * 1024 * 1024 # Bytes of pixel data the undo/redo history may keep
+
+
+class Snapshot:
+    """
+    Pixel data of one stored image, kept raw until memory runs short and then zlib-compressed.
+
+    A memory-mapped image (see large_image) already lives on disk: it is never compressed and
+    does not count towards the memory budget.
+    """
+
+    def __init__(self, image, reduced=None):
+        self.mapped = isinstance(image, np.memmap)
+        # Edits never write into an image in place, so no copy is needed
+        self.raw = image if self.mapped else np.ascontiguousarray(image)
+        self.packed = None
+        self.reduced = reduced # (n, copy decoded at 1/2**n size) for large images, see Pyramid
+        self.levels = None # Pyramid of the pixels, built when the image is first rendered
+        self.shape = image.shape
+        self.dtype = image.dtype
+
+    @property
+    def nbytes(self):
+        if self.mapped:
+            stored = 0
+        else:
+            stored = self.raw.nbytes if self.raw is not None else len(self.packed)
+        if self.levels is not None:
+            # The pyramid's first level is raw itself while the snapshot is uncompressed (or mapped)
+            stored += self.levels.nbytes - (self.raw.nbytes if self.raw is not None else 0)
+        return stored
+
+    def compress(self):
+        """Replaces the raw pixels by a zlib-compressed copy (lossless) and drops the pyramid."""
+        if self.raw is not None and not self.mapped:
+            self.packed = zlib.compress(self.raw.tobytes(), 1)
+            self.raw = None
+        self.levels = None
+
+    def pixels(self):
+        """Returns the pixels, decompressing them if needed; the array must not be modified."""
+        if self.raw is not None:
+            return self.raw
+        return np.frombuffer(zlib.decompress(self.packed), dtype=self.dtype).reshape(self.shape)
+
+    def pyramid(self):
+        if self.levels is None:
+            self.levels = Pyramid(self.pixels(), self.reduced)
+        return self.levels
+
+
+class State:
+    """
+    An image in the history, stored as a snapshot plus the edits applied to it.
+
+    Edits only extend ops (see image_ops.derive), so every state after a load shares the
+    snapshot's pixels and the result is only computed when it is rendered.
+    """
+
+    def __init__(self, snapshot, ops=()):
+        self.snapshot = snapshot
+        self.ops = ops
+        self.last_used = 0
+
+    def derive(self, op):
+        """Returns the state obtained by applying op to this one."""
+        return State(self.snapshot, derive(self.ops, op))
+
+    @property
+    def shape(self):
+        """(height, width) of the edited image, worked out without rendering it."""
+        return output_shape(self.snapshot.shape, self.ops)
+
+    def render(self, max_size=None):
+        """Renders the edited image at display size (fitting within max_size) or, by default, at full resolution."""
+        return render(self.snapshot.pyramid(), self.ops, max_size)
+
+    def save(self, path):
+        """Renders the edited image at full resolution into path (tile by tile for large images)."""
+        return write_image(path, self.snapshot.pyramid(), self.ops)
+
+
+class EditHistory:
+    """
+    Undo/redo stacks of image states with a memory budget.
+
+    The stacks behave like the plain lists of images the editor used before, but store states:
+    edits share their snapshot's pixels, raw snapshots are compressed least-recently-used first once the
+    budget is exceeded, and if that is not enough the least recently used end of either stack is
+    dropped (never the current state), as long as that frees a snapshot no other state uses.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self.undo_stack = []
+        self.redo_stack = []
+        self.clock = itertools.count(1)
+
+    def __len__(self):
+        return len(self.undo_stack)
+
+    def touch(self, state):
+        state.last_used = next(self.clock)
+        return state
+
+    def reset(self, image, reduced=None):
+        """Starts a new history holding only image (with its reduced copy, if any); returns its state."""
+        state = self.touch(State(Snapshot(image, reduced)))
+        self.undo_stack = [state]
+        self.redo_stack = []
+        self.enforce_budget()
+        return state
+
+    def record(self, state):
+        """Pushes the current state before an edit."""
+        self.undo_stack.append(self.touch(state))
+        self.enforce_budget()
+
+    def undo(self):
+        """Moves the newest state to the redo stack and returns the one now on top, or None."""
+        if len(self.undo_stack) > 1:
+            self.redo_stack.append(self.touch(self.undo_stack.pop()))
+            return self.touch(self.undo_stack[-1])
+        return None
+
+    def redo(self, state):
+        """Saves the current state on the undo stack and returns the state popped from the redo stack, or None."""
+        if self.redo_stack:
+            self.undo_stack.append(self.touch(state))
+            restored = self.touch(self.redo_stack.pop())
+            self.enforce_budget()
+            return restored
+        return None
+
+    def snapshots(self):
+        """Distinct snapshots referenced by either stack."""
+        unique = {}
+        for state in itertools.chain(self.undo_stack, self.redo_stack):
+            unique[id(state.snapshot)] = state.snapshot
+        return list(unique.values())
+
+    def memory_used(self):
+        return sum(snapshot.nbytes for snapshot in self.snapshots())
+
+    def enforce_budget(self):
+        """Compresses, then drops, the least recently used states until the stacks fit in the budget."""
+        used = self.memory_used()
+        if used <= self.budget:
+            return
+
+        last_used = {}
+        for state in itertools.chain(self.undo_stack, self.redo_stack):
+            key = id(state.snapshot)
+            last_used[key] = max(last_used.get(key, 0), state.last_used)
+        for snapshot in sorted(self.snapshots(), key=lambda s: last_used[id(s)]):
+            if snapshot.raw is None and snapshot.levels is None:
+                continue
+            used -= snapshot.nbytes
+            snapshot.compress()
+            used += snapshot.nbytes
+            if used <= self.budget:
+                return
+
+        while used > self.budget:
+            # A state is only a snapshot and a tuple of ops, so dropping one frees nothing
+            # unless no other state shares its snapshot
+            users = collections.Counter(id(state.snapshot) for state in itertools.chain(self.undo_stack,
+                                                                                         self.redo_stack))
+            candidates = []
+            if len(self.undo_stack) > 1: # the top of the undo stack is needed to undo at all
+                candidates.append(self.undo_stack)
+            if self.redo_stack:
+                candidates.append(self.redo_stack)
+            candidates = [stack for stack in candidates if users[id(stack[0].snapshot)] == 1]
+            if not candidates:
+                return
+            oldest = min(candidates, key=lambda stack: stack[0].last_used)
+            oldest.pop(0)
+            used = self.memory_used()
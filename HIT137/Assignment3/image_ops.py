@@ -0,0 +1,372 @@
+import math
+from collections import namedtuple
+import cv2 # OpenCV for image processing
+import numpy as np # for numerical operations
+
+# cv2.rotate codes for 1, 2 and 3 clockwise quarter turns
+ROTATIONS = {1: cv2.ROTATE_90_CLOCKWISE, 2: cv2.ROTATE_180, 3: cv2.ROTATE_90_COUNTERCLOCKWISE}
+
+TILE_SIZE = 2048 # Width and height of the tiles render_tiles produces at a time
+
+# What a chain of edits does to the source image, worked out without touching any pixel:
+# the source rectangle (x1, y1)-(x2, y2) is turned by resize_turns quarter turns, resampled once,
+# turned the rest of the way to turns quarter turns so it comes out width x height, and
+# optionally made gray. Resampling in the orientation the resize was asked for keeps
+# nearest-neighbour results identical to resizing step by step.
+# A crop after a resize makes the rectangle fractional; window then records the crop exactly,
+# in source orientation, as (x1, y1, x2, y2) source pixels resized to width x height, of which
+# the part starting at (x, y) is kept: (x1, y1, x2, y2, width, height, x, y). It is None otherwise.
+Plan = namedtuple("Plan", "x1 y1 x2 y2 turns width height gray interpolation resize_turns window")
+
+
+def fit_size(width, height, max_size):
+    """Returns the (width, height) of a width x height image shrunk to fit within max_size x max_size."""
+    scale = min(max_size / width, max_size / height, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def resize_interpolation(scale):
+    """Interpolation used for a resize by scale: fast nearest-neighbour below 50%, bilinear otherwise."""
+    return cv2.INTER_NEAREST if scale < 0.5 else cv2.INTER_LINEAR
+
+
+def resize_op(shape, scale):
+    """The ("resize", ...) operation that scales an image of the given shape by scale, as the Resize slider does."""
+    height, width = shape[:2]
+    return ("resize", max(1, int(width * scale)), max(1, int(height * scale)), resize_interpolation(scale))
+
+
+def grayscale(image):
+    """Converts a BGR image to gray, kept as three BGR channels so later edits see the same layout."""
+    return cv2.cvtColor(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), cv2.COLOR_GRAY2BGR)
+
+
+def derive(ops, op):
+    """
+    Returns the operation chain ops followed by op, folded so the chain stays short.
+
+    op is "rotate" (90 degrees clockwise), "grayscale", ("crop", x1, y1, x2, y2) or
+    ("resize", width, height, interpolation), all in the coordinates of the image ops produce.
+    Quarter turns add up, a resize right after another one replaces it (the image is only
+    resampled once) and grayscale applied twice is the same as once.
+    """
+    if op == "rotate":
+        if ops and ops[-1][0] == "rotate":
+            turns = (ops[-1][1] + 1) % 4
+            return ops[:-1] + ((("rotate", turns),) if turns else ())
+        return ops + (("rotate", 1),)
+    if op == "grayscale":
+        return ops if ("grayscale",) in ops else ops + (("grayscale",),)
+    if op[0] == "resize" and ops and ops[-1][0] == "resize":
+        return ops[:-1] + (op,)
+    return ops + (op,)
+
+
+def plan(shape, ops):
+    """
+    Folds an operation chain applied to an image of the given shape into a single Plan.
+
+    Crops become a rectangle of the source, rotations a number of quarter turns and all resizes
+    one output size, so rendering is one slice, one resize and at most two quarter-turn rotations
+    however long the chain. Resizes separated by a crop are folded into one too, so their result
+    can differ slightly from resampling twice.
+
+    Raises:
+        ValueError: If a crop lies entirely outside the image.
+    """
+    height, width = shape[:2]
+    x1, y1, x2, y2 = 0.0, 0.0, float(width), float(height) # Source rectangle
+    unrotated_width, unrotated_height = width, height # Its size after resizing, before turning
+    turns, gray, interpolation, resize_turns = 0, False, cv2.INTER_LINEAR, 0
+    frame = None # (x1, y1, x2, y2, width, height): whole source pixels the last resize turned into width x height
+    window_x, window_y = 0, 0 # Where the crops since that resize start in its result
+    for op in ops:
+        if op[0] == "grayscale":
+            gray = True # Gray commutes with the geometric edits, so it is applied last
+        elif op[0] == "rotate":
+            turns = (turns + op[1]) % 4
+        elif op[0] == "resize":
+            _, new_width, new_height, interpolation = op
+            resize_turns = turns
+            unrotated_width, unrotated_height = ((new_width, new_height) if turns % 2 == 0
+                                                 else (new_height, new_width))
+            whole = all(float(value).is_integer() for value in (x1, y1, x2, y2))
+            frame = (int(x1), int(y1), int(x2), int(y2), unrotated_width, unrotated_height) if whole else None
+            window_x, window_y = 0, 0
+        else:
+            _, cx1, cy1, cx2, cy2 = op
+            shown_width, shown_height = ((unrotated_width, unrotated_height) if turns % 2 == 0
+                                         else (unrotated_height, unrotated_width))
+            cx1, cx2 = max(cx1, 0), min(cx2, shown_width)
+            cy1, cy2 = max(cy1, 0), min(cy2, shown_height)
+            if cx2 <= cx1 or cy2 <= cy1:
+                raise ValueError("Crop area is outside the image.")
+
+            # The same rectangle before the quarter turns
+            if turns == 0:
+                ux1, uy1, ux2, uy2 = cx1, cy1, cx2, cy2
+            elif turns == 1:
+                ux1, uy1, ux2, uy2 = cy1, unrotated_height - cx2, cy2, unrotated_height - cx1
+            elif turns == 2:
+                ux1, uy1, ux2, uy2 = (unrotated_width - cx2, unrotated_height - cy2,
+                                      unrotated_width - cx1, unrotated_height - cy1)
+            else:
+                ux1, uy1, ux2, uy2 = unrotated_width - cy2, cx1, unrotated_width - cy1, cx2
+
+            # ... and before the resizes, in source pixels
+            scale_x = (x2 - x1) / unrotated_width
+            scale_y = (y2 - y1) / unrotated_height
+            x1, x2 = x1 + ux1 * scale_x, x1 + ux2 * scale_x
+            y1, y2 = y1 + uy1 * scale_y, y1 + uy2 * scale_y
+            unrotated_width, unrotated_height = ux2 - ux1, uy2 - uy1
+            window_x, window_y = window_x + ux1, window_y + uy1
+
+    window = None
+    if frame is not None and (window_x, window_y, unrotated_width, unrotated_height) != (0, 0) + frame[4:]:
+        window = frame + (window_x, window_y)
+    if turns % 2 == 0:
+        return Plan(x1, y1, x2, y2, turns, unrotated_width, unrotated_height, gray, interpolation, resize_turns,
+                    window)
+    return Plan(x1, y1, x2, y2, turns, unrotated_height, unrotated_width, gray, interpolation, resize_turns,
+                window)
+
+
+def recipe_ops(shape, recipe):
+    """
+    Turns a list of edits into the operation chain for an image of the given shape.
+
+    recipe holds the edits as the editor's buttons apply them: "grayscale", "rotate",
+    ("crop", x1, y1, x2, y2) or ("scale", factor), each relative to the result of the previous ones.
+    """
+    ops = ()
+    for step in recipe:
+        if isinstance(step, tuple) and step[0] == "scale":
+            step = resize_op(output_shape(shape, ops), step[1])
+        ops = derive(ops, step)
+    return ops
+
+
+def output_shape(shape, ops):
+    """(height, width) of the image ops produce from an image of the given shape."""
+    result = plan(shape, ops)
+    return result.height, result.width
+
+
+def pixel_range(start, stop, limit):
+    """Rounds a source interval to whole pixels inside [0, limit), keeping at least one pixel."""
+    start = min(max(int(round(start)), 0), limit - 1)
+    return start, min(max(int(round(stop)), start + 1), limit)
+
+
+class Pyramid:
+    """
+    An image together with half-size copies of it, built the first time they are needed.
+
+    Display-size renders read from the smallest copy that still has enough pixels, so
+    previewing a large image does not resample every source pixel each time.
+
+    reduced, if given, is (n, the image already halved n times), e.g. decoded directly at a
+    reduced size with cv2.IMREAD_REDUCED_*. The levels between it and the full image are then
+    never built, since that would read the whole full-size image: renders that need more detail
+    read just the part they show from the full image instead.
+    """
+
+    def __init__(self, image, reduced=None):
+        self.levels = [image]
+        if reduced is not None:
+            n, small = reduced
+            self.levels += [None] * (n - 1) + [small]
+
+    @property
+    def shape(self):
+        return self.levels[0].shape
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self.levels if level is not None)
+
+    def level(self, n):
+        """Returns the copy halved n times, or the nearest finer one that exists (or the smallest one there is)."""
+        while len(self.levels) <= n:
+            height, width = self.levels[-1].shape[:2]
+            if width < 2 or height < 2:
+                break
+            self.levels.append(cv2.resize(self.levels[-1], ((width + 1) // 2, (height + 1) // 2),
+                                          interpolation=cv2.INTER_AREA))
+        n = min(n, len(self.levels) - 1)
+        while self.levels[n] is None:
+            n -= 1
+        return self.levels[n]
+
+
+def render(source, ops, max_size=None):
+    """
+    Produces the image an operation chain describes.
+
+    Parameters:
+        source: The unedited BGR image, or a Pyramid of it.
+        ops (tuple): Operation chain, as built by derive.
+        max_size (int): Render only at display size, fitting within max_size x max_size,
+            or None for the full-resolution result.
+
+    Returns:
+        numpy.ndarray: The BGR result; without a resize or rotation it may be a view of source.
+    """
+    pyramid = source if isinstance(source, Pyramid) else Pyramid(source)
+    steps = plan(pyramid.shape, ops)
+    if max_size is None and steps.window is not None:
+        return render_window(pyramid.level(0), steps)
+    width, height = steps.width, steps.height
+    if max_size is not None:
+        width, height = fit_size(width, height, max_size)
+
+    # The smallest pyramid level that still has a source pixel for every output pixel
+    image = pyramid.level(0)
+    if max_size is not None:
+        source_width, source_height = ((steps.x2 - steps.x1, steps.y2 - steps.y1) if steps.turns % 2 == 0
+                                       else (steps.y2 - steps.y1, steps.x2 - steps.x1))
+        zoom = min(source_width / width, source_height / height)
+        if zoom >= 2:
+            image = pyramid.level(int(math.log2(zoom)))
+    factor_y = image.shape[0] / pyramid.shape[0]
+    factor_x = image.shape[1] / pyramid.shape[1]
+    x1, x2 = pixel_range(steps.x1 * factor_x, steps.x2 * factor_x, image.shape[1])
+    y1, y2 = pixel_range(steps.y1 * factor_y, steps.y2 * factor_y, image.shape[0])
+
+    result = image[y1:y2, x1:x2]
+    if steps.resize_turns:
+        result = cv2.rotate(result, ROTATIONS[steps.resize_turns])
+    remaining_turns = (steps.turns - steps.resize_turns) % 4
+    resize_width, resize_height = (width, height) if remaining_turns % 2 == 0 else (height, width)
+    if result.shape[:2] != (resize_height, resize_width):
+        shrinking = resize_width < result.shape[1] and resize_height < result.shape[0]
+        interpolation = cv2.INTER_AREA if max_size is not None and shrinking else steps.interpolation
+        result = cv2.resize(result, (resize_width, resize_height), interpolation=interpolation)
+    if remaining_turns:
+        result = cv2.rotate(result, ROTATIONS[remaining_turns])
+    if steps.gray:
+        result = grayscale(result)
+    return result
+
+
+def render_window(image, steps):
+    """
+    Renders a plan whose crop follows its resize exactly as the edits were applied: the whole
+    resized area is resampled and the crop cut out of it, instead of rounding the crop to source pixels.
+    """
+    x1, y1, x2, y2, frame_width, frame_height, window_x, window_y = steps.window
+    result = image[y1:y2, x1:x2]
+    if steps.resize_turns:
+        result = cv2.rotate(result, ROTATIONS[steps.resize_turns])
+    size = (frame_width, frame_height) if steps.resize_turns % 2 == 0 else (frame_height, frame_width)
+    result = cv2.resize(result, size, interpolation=steps.interpolation)
+    if steps.resize_turns:
+        result = cv2.rotate(result, ROTATIONS[4 - steps.resize_turns])
+    width, height = (steps.width, steps.height) if steps.turns % 2 == 0 else (steps.height, steps.width)
+    result = result[window_y:window_y + height, window_x:window_x + width]
+    if steps.turns:
+        result = cv2.rotate(result, ROTATIONS[steps.turns])
+    if steps.gray:
+        result = grayscale(result)
+    return result
+
+
+def turn_rect(x1, y1, x2, y2, width, height, turns):
+    """The rectangle (x1, y1)-(x2, y2) of a width x height image after turning the image clockwise turns times."""
+    for _ in range(turns % 4):
+        x1, y1, x2, y2, width, height = height - y2, x1, height - y1, x2, height, width
+    return x1, y1, x2, y2
+
+
+def sample_positions(size, source_size, interpolation):
+    """Source coordinate of each output pixel of a resize from source_size to size pixels, as cv2.resize computes them."""
+    positions = np.arange(size, dtype=np.float64)
+    # OpenCV inverts the output/source ratio rather than dividing, which decides where floor lands
+    scale = 1.0 / (size / source_size)
+    if interpolation == cv2.INTER_NEAREST:
+        return np.minimum(np.floor(positions * scale), source_size - 1)
+    return (positions + 0.5) * scale - 0.5
+
+
+def render_tiles(source, ops, out, tile_size=TILE_SIZE):
+    """
+    Renders an operation chain at full resolution into out, one tile at a time.
+
+    Each tile reads only the part of the source it covers (resampled with cv2.remap at the
+    positions cv2.resize would use), so with a memory-mapped source and out, an image larger
+    than memory can be processed with memory for a few tiles. Nearest-neighbour resizes give
+    the same pixels as render; bilinear ones can differ by one level, as cv2.remap interpolates
+    with coarser weights than cv2.resize (check_tiles.py compares the two).
+
+    Parameters:
+        source: The unedited BGR image, or a Pyramid of it.
+        ops (tuple): Operation chain, as built by derive.
+        out (numpy.ndarray): Array of shape output_shape(source.shape, ops) + (3,) to fill.
+    """
+    image = source.level(0) if isinstance(source, Pyramid) else source
+    steps = plan(image.shape, ops)
+    # The image is turned by resize_turns, resized to the "zoomed" size and then turned the rest of the way
+    remaining = (steps.turns - steps.resize_turns) % 4
+    zoomed_width, zoomed_height = ((steps.width, steps.height) if remaining % 2 == 0
+                                   else (steps.height, steps.width))
+    if steps.window is None:
+        x1, x2 = pixel_range(steps.x1, steps.x2, image.shape[1])
+        y1, y2 = pixel_range(steps.y1, steps.y2, image.shape[0])
+        frame_width, frame_height, window_x, window_y = zoomed_width, zoomed_height, 0, 0
+    else:
+        # Resample the whole resized area at the positions cv2.resize would use, keeping the cropped part
+        x1, y1, x2, y2, frame_width, frame_height, window_x, window_y = steps.window
+        unturned_width, unturned_height = ((steps.width, steps.height) if steps.turns % 2 == 0
+                                           else (steps.height, steps.width))
+        window_x, window_y, _, _ = turn_rect(window_x, window_y, window_x + unturned_width,
+                                             window_y + unturned_height, frame_width, frame_height,
+                                             steps.resize_turns)
+        if steps.resize_turns % 2:
+            frame_width, frame_height = frame_height, frame_width
+    source_width, source_height = x2 - x1, y2 - y1
+    turned_width, turned_height = ((source_width, source_height) if steps.resize_turns % 2 == 0
+                                   else (source_height, source_width))
+    columns = sample_positions(frame_width, turned_width, steps.interpolation)[window_x:window_x + zoomed_width]
+    rows = sample_positions(frame_height, turned_height, steps.interpolation)[window_y:window_y + zoomed_height]
+
+    for top in range(0, steps.height, tile_size):
+        bottom = min(top + tile_size, steps.height)
+        for left in range(0, steps.width, tile_size):
+            right = min(left + tile_size, steps.width)
+
+            # The zoomed rows and columns that end up in this output tile
+            if remaining == 0:
+                tile_rows, tile_columns = rows[top:bottom], columns[left:right]
+            elif remaining == 1:
+                tile_rows, tile_columns = rows[zoomed_height - right:zoomed_height - left], columns[top:bottom]
+            elif remaining == 2:
+                tile_rows = rows[zoomed_height - bottom:zoomed_height - top]
+                tile_columns = columns[zoomed_width - right:zoomed_width - left]
+            else:
+                tile_rows, tile_columns = rows[left:right], columns[zoomed_width - bottom:zoomed_width - top]
+
+            # ... and where they come from in the cropped source, undoing resize_turns
+            grid_x, grid_y = np.meshgrid(tile_columns, tile_rows)
+            if steps.resize_turns == 1:
+                grid_x, grid_y = grid_y, (source_height - 1) - grid_x
+            elif steps.resize_turns == 2:
+                grid_x, grid_y = (source_width - 1) - grid_x, (source_height - 1) - grid_y
+            elif steps.resize_turns == 3:
+                grid_x, grid_y = (source_width - 1) - grid_y, grid_x
+
+            # Only the source pixels under the tile (plus the interpolation's neighbours) are read
+            left_pixel = max(int(np.floor(grid_x.min())), 0)
+            top_pixel = max(int(np.floor(grid_y.min())), 0)
+            right_pixel = min(int(np.ceil(grid_x.max())) + 2, source_width)
+            bottom_pixel = min(int(np.ceil(grid_y.max())) + 2, source_height)
+            window = image[y1 + top_pixel:y1 + bottom_pixel, x1 + left_pixel:x1 + right_pixel]
+            tile = cv2.remap(window, (grid_x - left_pixel).astype(np.float32),
+                             (grid_y - top_pixel).astype(np.float32), steps.interpolation,
+                             borderMode=cv2.BORDER_REPLICATE)
+
+            if remaining:
+                tile = cv2.rotate(tile, ROTATIONS[remaining])
+            if steps.gray:
+                tile = grayscale(tile)
+            out[top:bottom, left:right] = tile
+    return out
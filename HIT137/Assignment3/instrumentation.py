@@ -0,0 +1,148 @@
+import csv
+import functools
+import json
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+ROLLING_ACTIONS = 20 # Actions the status bar summary averages over
+TRACE_FIELDS = ["action_id", "action", "stage", "start_ms", "duration_ms", "memory_delta_kb", "memory_peak_kb"]
+NOT_PROFILING = nullcontext() # Reusable do-nothing context returned while profiling is off
+
+
+class Profiler:
+    """
+    Opt-in latency and memory instrumentation for the editor.
+
+    An action is one user-facing handler (a button, a shortcut, a drag update); stages are the
+    steps inside it (decode, render, color conversion, thumbnail, PhotoImage creation, ...).
+    An action that runs no stage did no work (a shortcut with nothing to undo, a mouse release
+    outside crop mode) and is left out. Every other action and its stages become trace records,
+    written to trace_path as they finish, so a long session does not collect them in memory.
+    Memory is measured with tracemalloc, which sees the NumPy and OpenCV arrays the editor
+    allocates. When disabled, action and stage return a shared do-nothing context, so the hooks
+    cost next to nothing.
+    """
+
+    def __init__(self, enabled=False, trace_path=None, listener=None):
+        self.enabled = enabled
+        self.trace_path = trace_path # .json or .csv file the records are written to, until close()
+        self.listener = listener # Called with the summary text after every action
+        self.recent = deque(maxlen=ROLLING_ACTIONS)
+        self.current = None # Record of the action in progress
+        self.action_count = 0
+        self.origin = time.perf_counter()
+        self.trace = None
+        self.writer = None # csv.DictWriter for CSV traces
+        self.written = 0
+        if enabled and trace_path:
+            self.trace = open(trace_path, "w", newline="", encoding="utf-8")
+            if trace_path.lower().endswith(".csv"):
+                self.writer = csv.DictWriter(self.trace, fieldnames=TRACE_FIELDS)
+                self.writer.writeheader()
+            else:
+                self.trace.write("[")
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def action(self, name):
+        """Context manager timing one action; an action started inside another one counts as a stage of it."""
+        if not self.enabled:
+            return NOT_PROFILING
+        if self.current is not None:
+            return self.stage(name)
+        return self.measure_action(name)
+
+    def stage(self, name):
+        """Context manager timing one stage of the current action."""
+        if not self.enabled or self.current is None:
+            return NOT_PROFILING
+        return self.measure(name)
+
+    @contextmanager
+    def measure_action(self, name):
+        self.current = {"action": name, "stages": {}, "records": []}
+        try:
+            with self.measure(None) as record:
+                yield
+        finally:
+            current, self.current = self.current, None
+            if current["stages"]:
+                self.action_count += 1
+                for stage_record in current["records"]:
+                    stage_record["action_id"] = self.action_count
+                    self.write(stage_record)
+                record["action_id"] = self.action_count
+                self.write(record)
+                self.recent.append((record, current["stages"]))
+                if self.listener is not None:
+                    self.listener(self.summary())
+
+    @contextmanager
+    def measure(self, stage):
+        """Records the time, memory change and peak memory of the enclosed block."""
+        record = {"action_id": None, "action": self.current["action"], "stage": stage or ""}
+        memory_before = tracemalloc.get_traced_memory()[0]
+        if stage is None:
+            tracemalloc.reset_peak() # Peaks of stages are then relative to the action's start too
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            memory_after, memory_peak = tracemalloc.get_traced_memory()
+            record.update({
+                "start_ms": round((start - self.origin) * 1000, 3),
+                "duration_ms": round(seconds * 1000, 3),
+                "memory_delta_kb": round((memory_after - memory_before) / 1024, 1),
+                "memory_peak_kb": round(max(memory_peak - memory_before, 0) / 1024, 1),
+            })
+            if stage is not None:
+                self.current["records"].append(record) # Written once the action turns out to have done something
+                stages = self.current["stages"]
+                stages[stage] = stages.get(stage, 0.0) + seconds * 1000
+
+    def summary(self):
+        """One line describing the last action and the recent ones, for the status bar."""
+        if not self.recent:
+            return "Profiling: no actions yet"
+        last, stages = self.recent[-1]
+        slowest = sorted(stages.items(), key=lambda item: item[1], reverse=True)[:3]
+        details = ", ".join(f"{stage} {ms:.1f}" for stage, ms in slowest)
+        durations = [record["duration_ms"] for record, _ in self.recent]
+        return (f"{last['action']}: {last['duration_ms']:.1f} ms" + (f" ({details})" if details else "")
+                + f", memory {last['memory_delta_kb'] / 1024:+.1f} MB (peak {last['memory_peak_kb'] / 1024:.1f} MB)"
+                + f" | last {len(durations)}: avg {sum(durations) / len(durations):.1f} ms,"
+                + f" max {max(durations):.1f} ms")
+
+    def write(self, record):
+        """Appends one record to the trace file, if there is one."""
+        if self.trace is None:
+            return
+        if self.writer is not None:
+            self.writer.writerow(record)
+        else:
+            self.trace.write(("," if self.written else "") + "\n" + json.dumps(record))
+        self.written += 1
+
+    def close(self):
+        """Finishes and closes the trace file; returns its path, or None without one."""
+        if self.trace is None:
+            return None
+        if self.writer is None:
+            self.trace.write("\n]\n")
+        self.trace.close()
+        self.trace = None
+        return self.trace_path
+
+
+def profiled(name):
+    """Decorator running an ImageEditor method as one profiler action called name."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.action(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
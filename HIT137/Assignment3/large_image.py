@@ -0,0 +1,157 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import cv2 # OpenCV for image processing
+import numpy as np # for numerical operations
+from PIL import Image # only used to read image sizes from file headers
+from image_ops import Pyramid, output_shape, render, render_tiles
+
+# Images whose decoded pixels take more than this many bytes are memory-mapped instead of kept in memory
+LARGE_IMAGE_BYTES = 256 * 1024 * 1024
+# Folder holding the decoded copies of large images
+RAW_CACHE = os.path.join(tempfile.gettempdir(), "chitra_raw_cache")
+# Bytes of decoded copies RAW_CACHE may hold; the least recently used are deleted beyond that
+RAW_CACHE_LIMIT = 4 * 1024 * 1024 * 1024
+# Age after which a half-written copy is taken to be left over from a crash, in seconds
+STALE_PART_AGE = 24 * 60 * 60
+# cv2.imread flags that decode at 1/2, 1/4 and 1/8 size (JPEG decodes these directly, without the full image)
+REDUCED_FLAGS = {1: cv2.IMREAD_REDUCED_COLOR_2, 2: cv2.IMREAD_REDUCED_COLOR_4, 3: cv2.IMREAD_REDUCED_COLOR_8}
+
+
+def image_size(path):
+    """Returns (width, height) from the file header without decoding the pixels, or None if unknown."""
+    # Large scans and panoramas are the point here, so PIL must not refuse to read their headers.
+    # Nothing is decoded, so its decompression bomb check is only lifted for this read.
+    limit, Image.MAX_IMAGE_PIXELS = Image.MAX_IMAGE_PIXELS, None
+    try:
+        with Image.open(path) as image:
+            return image.size
+    except Exception:
+        return None
+    finally:
+        Image.MAX_IMAGE_PIXELS = limit
+
+
+def raw_cache_path(path, folder=RAW_CACHE):
+    """Path of the decoded copy of an image file; it changes whenever the file does."""
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}"
+    return os.path.join(folder, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".npy")
+
+
+def evict_raw_cache(folder=RAW_CACHE, limit=RAW_CACHE_LIMIT, keep=None):
+    """
+    Deletes the least recently used decoded copies in folder until they take at most limit bytes.
+
+    keep is never deleted, and neither are copies still being written. Copies another editor
+    has open cannot be deleted on Windows; they are skipped.
+    """
+    copies = []
+    used = 0
+    now = time.time()
+    for entry in os.scandir(folder):
+        if not entry.is_file():
+            continue
+        stat = entry.stat()
+        if entry.name.endswith(".part") and now - stat.st_mtime > STALE_PART_AGE:
+            copies.append((0, stat.st_size, entry.path)) # Left over from a crash: goes first
+        elif entry.name.endswith(".npy") and entry.path != keep:
+            copies.append((stat.st_mtime, stat.st_size, entry.path))
+        used += stat.st_size
+    for _, size, path in sorted(copies):
+        if used <= limit:
+            break
+        try:
+            os.remove(path)
+            used -= size
+        except OSError:
+            pass
+
+
+def mapped_image(path, folder=RAW_CACHE, limit=RAW_CACHE_LIMIT):
+    """
+    Returns the decoded pixels of an image file as a read-only memory map.
+
+    The file is decoded once and the pixels written to a .npy file in folder; later loads of the
+    same file map that copy directly, and the operating system only keeps the pages in use in memory.
+    Copies are kept least recently used first within limit bytes (see evict_raw_cache).
+
+    Raises:
+        ValueError: If the image cannot be decoded.
+    """
+    cached = raw_cache_path(path, folder)
+    if os.path.exists(cached):
+        os.utime(cached) # Marks the copy as recently used
+    else:
+        image = cv2.imread(path)
+        if image is None:
+            raise ValueError("Failed to load image.")
+        os.makedirs(folder, exist_ok=True)
+        partial = cached + ".part"
+        with open(partial, "wb") as f:
+            np.save(f, image)
+        del image
+        os.replace(partial, cached) # Never leaves a half-written copy behind
+        evict_raw_cache(folder, limit, keep=cached)
+    return np.load(cached, mmap_mode="r")
+
+
+def reduced_image(path, width, height, min_size):
+    """
+    Decodes the image at the smallest of 1/2, 1/4 or 1/8 size that still covers min_size pixels.
+
+    Returns:
+        tuple: (n, image halved n times) as Pyramid expects it, or None if no reduction fits.
+    """
+    n = 0
+    while n < 3 and min(width, height) >> (n + 1) >= min_size:
+        n += 1
+    if n == 0:
+        return None
+    small = cv2.imread(path, REDUCED_FLAGS[n])
+    return (n, small) if small is not None else None
+
+
+def open_image(path, min_size=500, max_bytes=LARGE_IMAGE_BYTES, folder=RAW_CACHE):
+    """
+    Loads an image for editing.
+
+    Images up to max_bytes of pixels are read into memory as before. Larger ones are memory-mapped
+    (see mapped_image) and also decoded at a reduced size covering min_size pixels, for display.
+
+    Returns:
+        tuple: (image or None if it cannot be read, reduced copy as (n, image) or None).
+    """
+    size = image_size(path)
+    if size is None or size[0] * size[1] * 3 <= max_bytes:
+        return cv2.imread(path), None
+    return mapped_image(path, folder), reduced_image(path, size[0], size[1], min_size)
+
+
+def write_image(path, source, ops, folder=RAW_CACHE):
+    """
+    Renders an operation chain at full resolution and saves it to path.
+
+    A memory-mapped source is rendered tile by tile into a memory-mapped result, so saving does
+    not need the whole edited image in memory either.
+
+    Returns:
+        bool: What cv2.imwrite returns.
+    """
+    image = source.level(0) if isinstance(source, Pyramid) else source
+    if not isinstance(image, np.memmap):
+        return cv2.imwrite(path, render(source, ops))
+
+    os.makedirs(folder, exist_ok=True)
+    work = tempfile.mkdtemp(dir=folder)
+    try:
+        out = np.lib.format.open_memmap(os.path.join(work, "result.npy"), mode="w+", dtype=image.dtype,
+                                        shape=output_shape(image.shape, ops) + image.shape[2:])
+        render_tiles(source, ops, out)
+        saved = cv2.imwrite(path, out)
+        del out # Closes the map so the file can be removed (required on Windows)
+        return saved
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
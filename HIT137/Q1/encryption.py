@@ -1,5 +1,17 @@
-# for the encryption
-def encrypt(raw, n, m):
+import argparse
+import mmap
+import os
+import string
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache
+
+# default size of the blocks read in streaming mode (1 MiB)
+CHUNK_SIZE = 1 << 20
+
+# for the encryption (reference version, one character at a time)
+def encrypt_reference(raw, n, m):
     encrypted = ''
     for c in raw:
         if c >= 'a' and c <= 'm': # for the small letter alphabets
@@ -14,8 +26,8 @@ def encrypt(raw, n, m):
             encrypted += c   # for the non alphabetical characters
     return encrypted 
 
-# for the decryption
-def decrypt(encrypted, n,m):
+# for the decryption (reference version, one character at a time)
+def decrypt_reference(encrypted, n,m):
     decrypted = ''
     for c in encrypted:
         if c >= 'a' and c <= 'm': # for the small letter alphabets
@@ -30,32 +42,231 @@ def decrypt(encrypted, n,m):
             decrypted += c  # for the non alphabetical characters
     return decrypted 
 
+# for building the lookup tables
+# only ASCII letters change, so each table is built by running the reference function
+# over the 52 letters once per (n, m); every other character maps to itself
+@lru_cache(maxsize=64)
+def cipher_tables(reference, n, m):
+    """Returns (str table, 256-entry bytes table) matching reference(c, n, m) for every character."""
+    mapping = {c: reference(c, n, m) for c in string.ascii_letters}
+    bytes_table = bytearray(range(256))
+    for c, result in mapping.items():
+        bytes_table[ord(c)] = ord(result)  # results are always ASCII letters, so UTF-8 text is safe
+    return str.maketrans(mapping), bytes(bytes_table)
+
+# for the encryption
+def encrypt(raw, n, m):
+    return raw.translate(cipher_tables(encrypt_reference, n, m)[0])
+
+# for the decryption
+def decrypt(encrypted, n, m):
+    return encrypted.translate(cipher_tables(decrypt_reference, n, m)[0])
+
+# for encrypting UTF-8 (or any ASCII-compatible) bytes without decoding them
+def encrypt_bytes(raw, n, m):
+    return raw.translate(cipher_tables(encrypt_reference, n, m)[1])
+
+# for decrypting UTF-8 (or any ASCII-compatible) bytes without decoding them
+def decrypt_bytes(encrypted, n, m):
+    return encrypted.translate(cipher_tables(decrypt_reference, n, m)[1])
+
 def verify(raw, decrypted):
     return raw == decrypted
 
-# for the input of n and m for user
-n = int(input("Enter the integer n: "))
-m = int(input("Enter the integer m: "))
+# for reading a binary file in fixed-size chunks
+def read_chunks(f, chunk_size=CHUNK_SIZE):
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+# for translating each chunk with a bytes table (the cipher maps every byte on its own)
+def transform_chunks(chunks, table):
+    for chunk in chunks:
+        yield chunk.translate(table)
+
+# for writing the chunks out, returns the number of bytes written
+def write_chunks(chunks, f):
+    written = 0
+    for chunk in chunks:
+        f.write(chunk)
+        written += len(chunk)
+    return written
+
+# for encrypting or decrypting a whole stream with bounded memory (one chunk at a time)
+def transform_stream(src, dst, reference, n, m, chunk_size=CHUNK_SIZE):
+    table = cipher_tables(reference, n, m)[1]
+    return write_chunks(transform_chunks(read_chunks(src, chunk_size), table), dst)
+
+def encrypt_stream(src, dst, n, m, chunk_size=CHUNK_SIZE):
+    return transform_stream(src, dst, encrypt_reference, n, m, chunk_size)
+
+def decrypt_stream(src, dst, n, m, chunk_size=CHUNK_SIZE):
+    return transform_stream(src, dst, decrypt_reference, n, m, chunk_size)
+
+# for translating one byte range of the input into the same range of the output (runs in a worker)
+def transform_range(input_path, output_path, start, end, reference, n, m, chunk_size=CHUNK_SIZE):
+    table = cipher_tables(reference, n, m)[1]
+    with open(input_path, 'rb') as fin, open(output_path, 'r+b') as fout:
+        with mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as src, mmap.mmap(fout.fileno(), 0) as dst:
+            for pos in range(start, end, chunk_size):
+                stop = min(pos + chunk_size, end)
+                dst[pos:stop] = src[pos:stop].translate(table)
+    return end - start
+
+# for splitting [0, size) into byte ranges, a few per worker so faster workers pick up the slack
+def byte_ranges(size, workers, chunk_size=CHUNK_SIZE):
+    step = max(chunk_size, -(-size // (workers * 4)))
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+# for encrypting or decrypting a file on several cores: the input is memory-mapped, split into
+# byte ranges, and each worker writes its range straight into a pre-sized memory-mapped output
+def parallel_transform_file(input_path, output_path, reference, n, m, workers=None, chunk_size=CHUNK_SIZE):
+    workers = workers or os.cpu_count() or 1
+    # Sizing the output would overwrite the input with zero bytes before any of it is read
+    if same_file(input_path, output_path):
+        raise ValueError("input and output must be different files")
+    size = os.path.getsize(input_path)
+    with open(output_path, 'wb') as f:
+        f.truncate(size)
+    ranges = byte_ranges(size, workers, chunk_size)
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(ranges), 1))) as pool:
+        futures = [pool.submit(transform_range, input_path, output_path, start, end, reference, n, m, chunk_size)
+                   for start, end in ranges]
+        return sum(future.result() for future in futures)
+
+def parallel_encrypt_file(input_path, output_path, n, m, workers=None, chunk_size=CHUNK_SIZE):
+    return parallel_transform_file(input_path, output_path, encrypt_reference, n, m, workers, chunk_size)
+
+def parallel_decrypt_file(input_path, output_path, n, m, workers=None, chunk_size=CHUNK_SIZE):
+    return parallel_transform_file(input_path, output_path, decrypt_reference, n, m, workers, chunk_size)
+
+# for reading exactly size bytes (fewer only at end of stream), since pipes may return short reads
+def read_exactly(f, size):
+    data = f.read(size)
+    while data and len(data) < size:
+        more = f.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+# for checking that an encrypted stream decrypts back to the original, one chunk at a time
+# returns None when they match, otherwise the byte offset of the first difference
+def verify_stream(original, encrypted, n, m, chunk_size=CHUNK_SIZE):
+    table = cipher_tables(decrypt_reference, n, m)[1]
+    offset = 0
+    for decrypted in transform_chunks(read_chunks(encrypted, chunk_size), table):
+        expected = read_exactly(original, len(decrypted))
+        if decrypted != expected:
+            # the first differing byte, or where the shorter of the two ends
+            return offset + next((i for i, (a, b) in enumerate(zip(decrypted, expected)) if a != b),
+                                 min(len(decrypted), len(expected)))
+        offset += len(decrypted)
+    if original.read(1):
+        return offset  # the original is longer than the decrypted copy
+    return None
+
+def verify_files(original_path, encrypted_path, n, m, chunk_size=CHUNK_SIZE):
+    with open(original_path, 'rb') as original, open(encrypted_path, 'rb') as encrypted:
+        return verify_stream(original, encrypted, n, m, chunk_size)
+
+# for opening a path in binary mode, "-" means stdin/stdout
+def open_binary(stack, path, mode):
+    if path == '-':
+        return sys.stdin.buffer if 'r' in mode else sys.stdout.buffer
+    return stack.enter_context(open(path, mode))
+
+# the original interactive flow: prompts for n and m and uses raw_text.txt / encrypted_text.txt
+def interactive():
+    # for the input of n and m for user
+    n = int(input("Enter the integer n: "))
+    m = int(input("Enter the integer m: "))
+
+    # for reading raw text inside the file
+    with open('raw_text.txt', encoding = 'utf-8') as f:
+        raw_text = f.read()
+
+    # for encrypt the text
+    encrypted_text = encrypt(raw_text, n, m)
+    with open('encrypted_text.txt', 'w', encoding = 'utf-8') as f:
+        f.write(encrypted_text)
+
+    # for decrypt the text
+    decrypted_text = decrypt(encrypted_text, n, m)
+
+    # to verify the corectness
+    correct = verify(raw_text, decrypted_text)
+    print("Decryption Is Correct:", correct)
 
+    print("Decrypted Text:")
+    print(decrypted_text)
 
-# for reading raw text inside the file
-with open('raw_text.txt', encoding = 'utf-8') as f:
-    raw_text = f.read()
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        interactive()
+        return
 
+    parser = argparse.ArgumentParser(description="Encrypt, decrypt or verify a file in fixed-size chunks.")
+    parser.add_argument("mode", choices=["encrypt", "decrypt", "verify"],
+                        help="verify decrypts OUTPUT chunk by chunk and compares it with INPUT (the original)")
+    parser.add_argument("input", nargs="?", default="-", help="input file, '-' for stdin (default)")
+    parser.add_argument("output", nargs="?", default="-", help="output file, '-' for stdout (default)")
+    parser.add_argument("-n", type=int, required=True, help="the integer n")
+    parser.add_argument("-m", type=int, required=True, help="the integer m")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"bytes per chunk (default {CHUNK_SIZE})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes; above 1 the files are memory-mapped and split across them "
+                             "(0 = one per CPU, default 1 = single streaming pass)")
+    parser.add_argument("--verify", action="store_true",
+                        help="after encrypting, check that the output decrypts back to the input")
+    args = parser.parse_intermixed_args(argv)
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size must be positive")
+    if args.mode == "verify" or args.verify:
+        if '-' in (args.input, args.output):
+            parser.error("verifying needs real input and output files, not stdin/stdout")
+        if args.verify and args.mode != "encrypt":
+            parser.error("--verify only applies to encrypt")
 
-# for encrypt the text 
+    if args.mode == "verify":
+        report_verification(args)
+        return
+    if same_file(args.input, args.output):
+        parser.error("input and output must be different files (the output is truncated before the input is read)")
 
-encrypted_text = encrypt(raw_text, n, m)
-with open('encrypted_text.txt', 'w', encodings = 'utf-8') as f:
-    f.write(encrypted_text)
+    if args.workers != 1:
+        if '-' in (args.input, args.output):
+            parser.error("--workers needs real input and output files, not stdin/stdout")
+        parallel = parallel_encrypt_file if args.mode == "encrypt" else parallel_decrypt_file
+        parallel(args.input, args.output, args.n, args.m, args.workers, args.chunk_size)
+    else:
+        stream = encrypt_stream if args.mode == "encrypt" else decrypt_stream
+        with ExitStack() as stack:
+            src = open_binary(stack, args.input, 'rb')
+            dst = open_binary(stack, args.output, 'wb')
+            stream(src, dst, args.n, args.m, args.chunk_size)
+            dst.flush()
 
-# for decrypt the text
+    if args.verify:
+        report_verification(args)
 
-decrypted_text = decrypt(encrypted_text, n, m)
+# for checking whether two paths name the same existing file ('-' stands for stdin/stdout)
+def same_file(input_path, output_path):
+    if '-' in (input_path, output_path):
+        return False
+    return os.path.exists(input_path) and os.path.exists(output_path) and os.path.samefile(input_path, output_path)
 
-# to verify the corectness
-correct = verify(raw_text, decrypted_text)
-print("Decryption Is Correct:", correct)
+# for printing the result of a streaming verification (exits with status 1 on a mismatch)
+def report_verification(args):
+    mismatch = verify_files(args.input, args.output, args.n, args.m, args.chunk_size)
+    if mismatch is None:
+        print("Decryption Is Correct: True", file=sys.stderr)
+    else:
+        print(f"Decryption Is Correct: False (first difference at byte offset {mismatch})", file=sys.stderr)
+        sys.exit(1)
 
-print("Decrypted Text:")
-print(decrypted_text) 
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
-
+import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+import numpy as np
 import pandas as pd
+from partial_cache import PartialCache
+from temperature_store import open_store, store_folder
 
 # Define seasons
 seasons = {
@@ -10,114 +16,384 @@ seasons = {
     "Spring": ["September", "October", "November"]
 }
 
+# Month columns in the order they appear in the CSV files
+months = ["January", "February", "March", "April", "May", "June",
+          "July", "August", "September", "October", "November", "December"]
+
 # Input and output folders
 input_folder = "temperature_data"
 output_folder = "outputs"
-os.makedirs(output_folder, exist_ok=True)
 
-# Initialize data
-season_totals = {season: [] for season in seasons}  # For seasonal averages
-station_temperatures = {}  # For tracking all temperatures for each station
-station_ranges = {}  # For largest temperature range
+# On-disk cache of per-file statistics, so unchanged years are not parsed again
+cache_file = os.path.join("cache", "partials.pkl")
+
+
+def prepare_block(data, file):
+    """
+    Converts a block of CSV rows into station names and a station-by-month reading matrix.
+
+    Parameters:
+        data (pandas.DataFrame): Rows read from a stations_group_YYYY.csv file.
+        file (str): File name used in error messages.
+
+    Returns:
+        tuple: (names, temps) where temps is a float64 array with one column per entry of months
+        (NaN where a reading is missing or not a number), or None if the block cannot be used.
+    """
+    # Check if required columns exist
+    if "STATION_NAME" not in data.columns:
+        print(f"Error: File '{file}' is missing required columns.")
+        return None
+
+    temps = data.reindex(columns=months).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    # Row-major like the stored matrices, so both paths reduce in the same order and agree exactly
+    return data["STATION_NAME"].to_numpy(), np.ascontiguousarray(temps)
 
-# Check if input folder exists
-if not os.path.exists(input_folder):
-    print(f"Error: Input folder '{input_folder}' does not exist.")
-    exit()
 
-# Process each file in the input folder
-csv_files = [file for file in os.listdir(input_folder) if file.endswith(".csv")]
-if not csv_files:
-    print("Error: No CSV files found in the input folder.")
-    exit()
+def read_station_chunks(file_path, chunk_rows=None, store=None):
+    """
+    Reads one yearly file as blocks of at most chunk_rows stations.
 
-print(f"Found {len(csv_files)} CSV files in the folder.")
+    When an up-to-date binary copy exists in the store, the blocks are slices of its memory map
+    and no text is parsed; otherwise the CSV is read.
 
-for file in csv_files:
-    print(f"Processing file: {file}")  # Print the file name
-    file_path = os.path.join(input_folder, file)
+    Parameters:
+        file_path (str): Path to a stations_group_YYYY.csv file.
+        chunk_rows (int): Rows per block, or None to read the whole file at once.
+        store (str): Folder of the binary store, or None to always read the CSV.
+
+    Yields:
+        tuple: (names, temps) blocks as returned by prepare_block. If the file fails partway
+        through, None is yielded last, so the blocks already read can be thrown away as well.
+    """
+    stored = open_store(file_path, store, months) if store else None
+    if stored is not None:
+        meta, temps = stored
+        names = np.array(meta["station_name"], dtype=object)
+        step = chunk_rows or max(len(names), 1)
+        for start in range(0, len(names), step):
+            yield names[start:start + step], temps[start:start + step]
+        return
+
+    file = os.path.basename(file_path)
     try:
-        data = pd.read_csv(file_path)
+        if chunk_rows:
+            blocks = pd.read_csv(file_path, chunksize=chunk_rows)
+        else:
+            blocks = [pd.read_csv(file_path)]
+        for data in blocks:
+            block = prepare_block(data, file)
+            yield block
+            if block is None:
+                return
     except Exception as e:
         print(f"Error reading file '{file}': {e}")
-        continue  # Skip this file and proceed to the next
+        yield None
 
-    # Check if required columns exist
-    required_columns = ["STATION_NAME"] + list(seasons.keys())
-    if not all(col in data.columns for col in required_columns):
-        print(f"Error: File '{file}' is missing required columns.")
-        continue
 
-    # Iterate through each row (station)
-    for _, row in data.iterrows():
-        station_name = row["STATION_NAME"]
+def reading_stats(values, axis=None):
+    """
+    Summarises readings as running statistics, ignoring NaN.
 
-        # Extract temperatures and handle missing data
-        try:
-            temperatures = pd.to_numeric(row[4:], errors="coerce")
-        except Exception as e:
-            print(f"Error processing temperatures for station '{station_name}' in file '{file}': {e}")
-            continue
-
-        # Update station data for warmest, coolest, and range calculations
-        if station_name not in station_temperatures:
-            station_temperatures[station_name] = []
-            station_ranges[station_name] = {"min": float("inf"), "max": float("-inf")}
-        
-        station_temperatures[station_name].extend(temperatures.dropna())
-        station_ranges[station_name]["min"] = min(station_ranges[station_name]["min"], temperatures.min())
-        station_ranges[station_name]["max"] = max(station_ranges[station_name]["max"], temperatures.max())
-
-        # Calculate seasonal averages
-        for season, months in seasons.items():
-            # Get valid column indices for the months, and ensure indices are within bounds
-            try:
-                month_indices = [data.columns.get_loc(month) for month in months if month in data.columns]
-                valid_month_indices = [index for index in month_indices if index < len(temperatures)]
-
-                if valid_month_indices:  # Ensure that valid month indices are available
-                    seasonal_values = temperatures[valid_month_indices].dropna()
-
-                    if not seasonal_values.empty:
-                        season_totals[season].extend(seasonal_values)
-            except Exception as e:
-                print(f"Error calculating seasonal averages for station '{station_name}' in file '{file}': {e}")
+    Parameters:
+        values (numpy.ndarray): Readings, possibly memory-mapped.
+        axis (int): Axis to reduce over, or None to reduce over every reading.
+
+    Returns:
+        dict: count, sum, min, max, mean and m2 (sum of squared deviations from the mean).
+    """
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=axis)
+    total = np.where(valid, values, 0.0).sum(axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+    centred = np.where(valid, values - (np.expand_dims(mean, axis) if axis is not None else mean), 0.0)
+    return {
+        "count": count,
+        "sum": total,
+        "min": np.where(valid, values, np.inf).min(axis=axis, initial=np.inf),
+        "max": np.where(valid, values, -np.inf).max(axis=axis, initial=-np.inf),
+        "mean": mean,
+        "m2": (centred ** 2).sum(axis=axis),
+    }
+
+
+def block_stats(names, temps):
+    """
+    Computes per-station and per-season statistics of one block of stations.
+
+    Parameters:
+        names (numpy.ndarray): Station name of each row.
+        temps (numpy.ndarray): Station-by-month readings, columns in the order of months.
+
+    Returns:
+        tuple: (station_stats, season_stats) DataFrames with count, sum, min, max, mean and m2
+        columns, in first-seen order. Stations and seasons without readings are left out.
+    """
+    station_stats = pd.DataFrame(reading_stats(temps, axis=1), index=pd.Index(names, name="STATION_NAME"))
+    station_stats = station_stats[station_stats["count"] > 0]
+    if not station_stats.index.is_unique:
+        station_stats = combine_duplicates(station_stats)
+
+    season_rows = {}
+    for season, season_months in seasons.items():
+        stats = reading_stats(temps[:, [months.index(month) for month in season_months]])
+        if stats["count"] > 0:
+            season_rows[season] = stats
+    season_stats = pd.DataFrame.from_dict(season_rows, orient="index",
+                                          columns=["count", "sum", "min", "max", "mean", "m2"])
+    return station_stats, season_stats
+
+
+def combine_duplicates(stats):
+    """Merges statistics of rows sharing an index value (a station listed twice in one file)."""
+    grouped = stats.groupby(level=0, sort=False)
+    combined = grouped.agg({"count": "sum", "sum": "sum", "min": "min", "max": "max"})
+    combined["mean"] = combined["sum"] / combined["count"]
+    spread = stats["count"] * (stats["mean"] - combined["mean"].reindex(stats.index).to_numpy()) ** 2
+    combined["m2"] = (stats["m2"] + spread).groupby(level=0, sort=False).sum()
+    return combined
+
+
+def merge_stats(total, partial):
+    """
+    Folds one block of running statistics into the accumulated totals.
+
+    Counts, sums, minimums and maximums combine directly; means and m2 use the parallel form of
+    Welford's update, so the result equals a single pass over both blocks' readings.
+
+    Parameters:
+        total (pandas.DataFrame): Accumulated statistics, or None before the first block.
+        partial (pandas.DataFrame): Statistics of the next block, as returned by block_stats.
+
+    Returns:
+        pandas.DataFrame: Combined statistics; new groups are appended after the existing ones.
+    """
+    if total is None:
+        return partial
+    index = total.index.union(partial.index, sort=False)
+    a = total.reindex(index)
+    b = partial.reindex(index)
+    count_a = a["count"].fillna(0)
+    count_b = b["count"].fillna(0)
+    count = count_a + count_b
+    delta = b["mean"].fillna(0.0) - a["mean"].fillna(0.0)
+    merged = pd.DataFrame({
+        "count": count,
+        "sum": a["sum"].fillna(0.0) + b["sum"].fillna(0.0),
+        "min": np.fmin(a["min"], b["min"]),
+        "max": np.fmax(a["max"], b["max"]),
+    })
+    # Groups with no readings on one side keep the other side's mean unchanged
+    merged["mean"] = a["mean"].where(count_b == 0, a["mean"].fillna(0.0) + delta * count_b / count)
+    merged["mean"] = merged["mean"].where(count_a > 0, b["mean"])
+    merged["m2"] = (a["m2"].fillna(0.0) + b["m2"].fillna(0.0)
+                    + (delta ** 2 * count_a * count_b / count).fillna(0.0))
+    return merged
+
+
+def file_partials(file_path, chunk_rows=None, store=None):
+    """
+    Reads one file block by block and returns its running statistics.
+
+    Parameters:
+        file_path (str): Path to a stations_group_YYYY.csv file.
+        chunk_rows (int): Rows per block, or None to read the whole file at once.
+        store (str): Folder of the binary store, or None to always read the CSV.
+
+    Returns:
+        tuple: (station_stats, season_stats) DataFrames as returned by merge_stats,
+        or None if the file cannot be used. A file that fails partway through is not used at all,
+        whatever chunk_rows is.
+    """
+    print(f"Processing file: {os.path.basename(file_path)}")  # Print the file name
+    station_stats = season_stats = None
+    for block in read_station_chunks(file_path, chunk_rows, store):
+        if block is None:
+            return None
+        names, temps = block
+        block_station_stats, block_season_stats = block_stats(names, temps)
+        station_stats = merge_stats(station_stats, block_station_stats)
+        season_stats = merge_stats(season_stats, block_season_stats)
+    if station_stats is None:
+        return None
+    return station_stats, season_stats
+
+
+def accumulate(file_paths, workers=1, chunk_rows=None, cache=None, store=None):
+    """
+    Streams every file through the accumulators, in a process pool when workers > 1.
+
+    Each file's statistics are folded into the totals as soon as they arrive, so memory stays
+    proportional to the number of stations rather than the number of readings or files. Results
+    are folded in file order, so the totals are identical to the serial path. Files found in the
+    cache are not parsed again.
+
+    Parameters:
+        file_paths (list): Paths of the CSV files to process.
+        workers (int): Number of worker processes; 1 processes the files in this process.
+        chunk_rows (int): Rows read per block, or None to read each file at once.
+        cache (PartialCache): Cache of per-file statistics, or None to parse every file.
+        store (str): Folder of the binary store, or None to always read the CSV files.
+
+    Returns:
+        tuple: (station_totals, season_totals) DataFrames, or None if no file could be used.
+    """
+    read_file = partial(file_partials, chunk_rows=chunk_rows, store=store)
+    cached = {}
+    if cache is not None:
+        for file_path in file_paths:
+            result = cache.lookup(file_path)
+            if result is not None:
+                print(f"Using cached results for file: {os.path.basename(file_path)}")
+                cached[file_path] = result
+    pending = [file_path for file_path in file_paths if file_path not in cached]
+
+    station_totals = season_totals = None
+    with ExitStack() as stack:
+        if workers > 1 and len(pending) > 1:
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            parsed = pool.map(read_file, pending)
+        else:
+            parsed = map(read_file, pending)
+        for file_path in file_paths:
+            if file_path in cached:
+                result = cached[file_path]
+            else:
+                result = next(parsed)
+                # None also covers a file that failed partway through: only files read cleanly to
+                # the end are cached, so a broken file is reported again on every run until fixed
+                if result is not None and cache is not None:
+                    cache.store(file_path, result)
+            if result is None:
                 continue
+            station_totals = merge_stats(station_totals, result[0])
+            season_totals = merge_stats(season_totals, result[1])
+    if station_totals is None:
+        return None
+    return station_totals, season_totals
+
+
+def aggregate(station_totals, season_totals):
+    """
+    Turns the accumulated totals into seasonal averages and per-station statistics.
+
+    Parameters:
+        station_totals (pandas.DataFrame): Per-station totals returned by accumulate.
+        season_totals (pandas.DataFrame): Per-season totals returned by accumulate.
+
+    Returns:
+        tuple: (season_averages dict, station_stats DataFrame with mean, min, max and std per station)
+    """
+    season_means = season_totals["sum"] / season_totals["count"]
+    season_averages = {season: round(season_means[season], 2) if season in season_means else None
+                       for season in seasons}
+    station_stats = pd.DataFrame({"mean": station_totals["sum"] / station_totals["count"],
+                                  "min": station_totals["min"], "max": station_totals["max"],
+                                  "std": np.sqrt(station_totals["m2"] / station_totals["count"])})
+    return season_averages, station_stats
+
+
+def largest_range_stations(station_stats):
+    """Returns the station(s) whose maximum minus minimum reading is largest, in first-seen order."""
+    ranges = station_stats["max"] - station_stats["min"]
+    return list(ranges.index[ranges == ranges.max()])
+
+
+def warmest_and_coolest_stations(station_stats):
+    """Returns (warmest, coolest) station lists, comparing averages rounded to 2 decimals."""
+    station_avg_temps = station_stats["mean"].round(2)
+    warmest_stations = list(station_avg_temps.index[station_avg_temps == station_avg_temps.max()])
+    coolest_stations = list(station_avg_temps.index[station_avg_temps == station_avg_temps.min()])
+    return warmest_stations, coolest_stations
+
+
+def write_outputs(season_averages, station_stats):
+    """Writes the three result files into the output folder."""
+    # Task 1: Calculate average temperatures for each season across all years
+    try:
+        with open(os.path.join(output_folder, "average_temp.txt"), "w") as f:
+            f.write("Average Seasonal Temperatures:\n")
+            for season, avg in season_averages.items():
+                f.write(f"{season}: {avg}\n")
+    except Exception as e:
+        print(f"Error writing seasonal averages to file: {e}")
+
+    # Task 2: Find the station(s) with the largest temperature range
+    try:
+        largest_stations = largest_range_stations(station_stats)
+        with open(os.path.join(output_folder, "largest_temp_range_station.txt"), "w") as f:
+            f.write("Station(s) with the Largest Temperature Range:\n")
+            f.write("\n".join(largest_stations))
+    except Exception as e:
+        print(f"Error identifying stations with largest temperature range: {e}")
+
+    # Task 3: Find the warmest and coolest station(s)
+    try:
+        warmest_stations, coolest_stations = warmest_and_coolest_stations(station_stats)
+        with open(os.path.join(output_folder, "warmest_and_coolest_station.txt"), "w") as f:
+            f.write("Warmest Station(s):\n")
+            f.write("\n".join(warmest_stations) + "\n")
+            f.write("Coolest Station(s):\n")
+            f.write("\n".join(coolest_stations))
+    except Exception as e:
+        print(f"Error identifying warmest and coolest stations: {e}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Aggregate station temperatures across the yearly CSV files.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes used to parse the files (0 = one per CPU, default 1)")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="read each CSV in blocks of this many rows to bound memory (default: whole file)")
+    parser.add_argument("--cache", default=cache_file,
+                        help=f"file caching per-file statistics between runs (default: {cache_file})")
+    parser.add_argument("--no-cache", action="store_true", help="parse every file and leave the cache untouched")
+    parser.add_argument("--store", default=store_folder,
+                        help="folder of binary copies built by temperature_store.py, read instead of "
+                             f"up-to-date CSV files (default: {store_folder})")
+    parser.add_argument("--no-store", action="store_true", help="always parse the CSV files")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workers = args.workers or os.cpu_count() or 1
+    os.makedirs(output_folder, exist_ok=True)
+
+    # Check if input folder exists
+    if not os.path.exists(input_folder):
+        print(f"Error: Input folder '{input_folder}' does not exist.")
+        return
+
+    # Process each file in the input folder
+    csv_files = sorted(file for file in os.listdir(input_folder) if file.endswith(".csv"))
+    if not csv_files:
+        print("Error: No CSV files found in the input folder.")
+        return
+
+    print(f"Found {len(csv_files)} CSV files in the folder.")
+
+    file_paths = [os.path.join(input_folder, file) for file in csv_files]
+    cache = None if args.no_cache else PartialCache(args.cache)
+    store = None if args.no_store else args.store
+    totals = accumulate(file_paths, workers, args.chunk_rows, cache, store)
+    if cache is not None:
+        try:
+            cache.save(keep_paths=file_paths)
+            print(f"Cache: {cache.hits} file(s) reused, {cache.misses} file(s) parsed.")
+        except OSError as e:
+            print(f"Error writing cache file '{cache.cache_path}': {e}")
+    if totals is None:
+        print("Error: No usable CSV files found in the input folder.")
+        return
+
+    season_averages, station_stats = aggregate(*totals)
+    write_outputs(season_averages, station_stats)
+
+    # Indicate completion
+    print("Processing complete. Results saved to output folder.")
+
 
-# Task 1: Calculate average temperatures for each season across all years
-try:
-    season_averages = {season: round(sum(values) / len(values), 2) if values else None for season, values in season_totals.items()}
-    with open(os.path.join(output_folder, "average_temp.txt"), "w") as f:
-        f.write("Average Seasonal Temperatures:\n")
-        for season, avg in season_averages.items():
-            f.write(f"{season}: {avg}\n")
-except Exception as e:
-    print(f"Error writing seasonal averages to file: {e}")
-
-# Task 2: Find the station(s) with the largest temperature range
-try:
-    largest_range = max((values["max"] - values["min"]) for values in station_ranges.values())
-    largest_range_stations = [station for station, values in station_ranges.items() if (values["max"] - values["min"]) == largest_range]
-    with open(os.path.join(output_folder, "largest_temp_range_station.txt"), "w") as f:
-        f.write("Station(s) with the Largest Temperature Range:\n")
-        f.write("\n".join(largest_range_stations))
-except Exception as e:
-    print(f"Error identifying stations with largest temperature range: {e}")
-
-# Task 3: Find the warmest and coolest station(s)
-try:
-    station_avg_temps = {station: round(sum(temps) / len(temps), 2) if temps else None for station, temps in station_temperatures.items()}
-    warmest_temp = max(station_avg_temps.values())
-    coolest_temp = min(station_avg_temps.values())
-    warmest_stations = [station for station, avg_temp in station_avg_temps.items() if avg_temp == warmest_temp]
-    coolest_stations = [station for station, avg_temp in station_avg_temps.items() if avg_temp == coolest_temp]
-    with open(os.path.join(output_folder, "warmest_and_coolest_station.txt"), "w") as f:
-        f.write("Warmest Station(s):\n")
-        f.write("\n".join(warmest_stations) + "\n")
-        f.write("Coolest Station(s):\n")
-        f.write("\n".join(coolest_stations))
-except Exception as e:
-    print(f"Error identifying warmest and coolest stations: {e}")
-
-# Indicate completion
-print("Processing complete. Results saved to output folder.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
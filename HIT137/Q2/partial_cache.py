@@ -0,0 +1,100 @@
+import hashlib
+import os
+import pickle
+
+# Bump when the layout of the cached statistics changes so old caches are ignored
+CACHE_VERSION = 2
+
+
+def file_digest(file_path, block_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file, read in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PartialCache:
+    """
+    On-disk cache of per-file statistics keyed by path, modification time, size and content hash.
+
+    A file whose modification time and size are unchanged is a hit without being read. If either
+    changed, the file is hashed and is still a hit when its content is identical (for example after
+    a copy or touch); only new or modified files have to be parsed again.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.entries = {}
+        self.hits = self.misses = 0
+        self.load()
+
+    def load(self):
+        """Reads the cache file, starting empty if it is missing, unreadable or from another version."""
+        try:
+            with open(self.cache_path, "rb") as f:
+                version, entries = pickle.load(f)
+        except Exception:
+            # Besides damaged files, this covers pickles naming pandas or NumPy internals that
+            # moved in a later release (ImportError, AttributeError), which CACHE_VERSION cannot track
+            return
+        if version == CACHE_VERSION:
+            self.entries = entries
+
+    def save(self, keep_paths=None):
+        """
+        Writes the cache file atomically.
+
+        Parameters:
+            keep_paths (list): If given, entries for any other path are dropped first,
+            so files removed from the input folder do not linger in the cache.
+        """
+        if keep_paths is not None:
+            keep = {os.path.abspath(path) for path in keep_paths}
+            self.entries = {path: entry for path, entry in self.entries.items() if path in keep}
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump((CACHE_VERSION, self.entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.cache_path)
+
+    def lookup(self, file_path):
+        """
+        Returns the cached statistics of a file, or None if the file is new or its content changed.
+
+        Parameters:
+            file_path (str): Path of the CSV file.
+        """
+        key = os.path.abspath(file_path)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        info = os.stat(file_path)
+        if (entry["mtime"], entry["size"]) != (info.st_mtime_ns, info.st_size):
+            if entry["size"] != info.st_size or entry["sha256"] != file_digest(file_path):
+                self.misses += 1
+                return None
+            # Same content under a new timestamp: refresh the key so the next run skips the hash
+            entry["mtime"] = info.st_mtime_ns
+        self.hits += 1
+        return entry["result"]
+
+    def store(self, file_path, result):
+        """
+        Records the statistics computed for a file together with its current fingerprint.
+
+        Parameters:
+            file_path (str): Path of the CSV file.
+            result: Picklable statistics for the file, computed from all of it. Statistics of a
+            file that could only be read in part must not be stored, as they would be reused
+            until the file changes.
+        """
+        info = os.stat(file_path)
+        self.entries[os.path.abspath(file_path)] = {
+            "mtime": info.st_mtime_ns,
+            "size": info.st_size,
+            "sha256": file_digest(file_path),
+            "result": result,
+        }
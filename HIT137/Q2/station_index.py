@@ -0,0 +1,227 @@
+import argparse
+import math
+import os
+import re
+import numpy as np
+import pandas as pd
+from Question2 import (aggregate, block_stats, input_folder, largest_range_stations, months, prepare_block,
+                       seasons, warmest_and_coolest_stations)
+from temperature_store import open_store, store_folder
+
+# Year in file names such as stations_group_1986.csv
+year_pattern = re.compile(r"(\d{4})(?!.*\d{4})")
+
+
+def load_year(file_path, store=None):
+    """
+    Loads one yearly file with the station coordinates needed by the index.
+
+    Parameters:
+        file_path (str): Path to a stations_group_YYYY.csv file.
+        store (str): Folder of the binary store, or None to always read the CSV.
+
+    Returns:
+        dict: names, stn_id, lat, lon and temps arrays (one row per station), or None if the file cannot be used.
+    """
+    stored = open_store(file_path, store, months) if store else None
+    if stored is not None:
+        meta, temps = stored
+        rows = len(meta["station_name"])
+        columns = {key: meta[key] if meta[key] is not None else [np.nan] * rows for key in ("stn_id", "lat", "lon")}
+        return {
+            "names": np.array(meta["station_name"], dtype=object),
+            "stn_id": np.asarray(columns["stn_id"], dtype=np.float64),
+            "lat": np.asarray(columns["lat"], dtype=np.float64),
+            "lon": np.asarray(columns["lon"], dtype=np.float64),
+            "temps": temps,
+        }
+
+    file = os.path.basename(file_path)
+    try:
+        data = pd.read_csv(file_path)
+    except Exception as e:
+        print(f"Error reading file '{file}': {e}")
+        return None
+    block = prepare_block(data, file)
+    if block is None:
+        return None
+    coordinates = data.reindex(columns=["STN_ID", "LAT", "LON"]).apply(pd.to_numeric, errors="coerce")
+    return {
+        "names": block[0],
+        "stn_id": coordinates["STN_ID"].to_numpy(dtype=np.float64),
+        "lat": coordinates["LAT"].to_numpy(dtype=np.float64),
+        "lon": coordinates["LON"].to_numpy(dtype=np.float64),
+        "temps": block[1],
+    }
+
+
+class StationIndex:
+    """
+    In-memory index of station readings by year and by coordinates.
+
+    Rows are kept sorted by year, so a year range is a contiguous slice found by binary search.
+    A grid of cell_size-degree cells maps each cell to its (sorted) row positions, so a latitude or
+    longitude filter only visits the rows of the cells it overlaps. A query therefore costs time
+    proportional to the rows it selects rather than a rescan of every file.
+    """
+
+    def __init__(self, names, stn_id, lat, lon, years, temps, cell_size=5.0):
+        order = np.argsort(years, kind="stable")
+        self.names = np.asarray(names, dtype=object)[order]
+        self.stn_id = np.asarray(stn_id, dtype=np.float64)[order]
+        self.lat = np.asarray(lat, dtype=np.float64)[order]
+        self.lon = np.asarray(lon, dtype=np.float64)[order]
+        self.years = np.asarray(years, dtype=np.int64)[order]
+        self.temps = np.ascontiguousarray(np.asarray(temps, dtype=np.float64)[order])
+        self.cell_size = cell_size
+
+        # Grid cells keyed by (latitude cell, longitude cell); rows without coordinates are left out
+        located = np.flatnonzero(~np.isnan(self.lat) & ~np.isnan(self.lon))
+        lat_cells = np.floor(self.lat[located] / cell_size).astype(np.int64)
+        lon_cells = np.floor(self.lon[located] / cell_size).astype(np.int64)
+        self.cells = {key: located[positions] for key, positions in
+                      pd.Series(located).groupby([lat_cells, lon_cells]).indices.items()}
+
+    @classmethod
+    def from_files(cls, file_paths, store=None, cell_size=5.0):
+        """
+        Builds the index from yearly files, taking each file's year from its name.
+
+        Parameters:
+            file_paths (list): Paths of the stations_group_YYYY.csv files.
+            store (str): Folder of the binary store, or None to always read the CSV files.
+            cell_size (float): Width and height of the grid cells in degrees.
+        """
+        parts = []
+        for file_path in file_paths:
+            file = os.path.basename(file_path)
+            match = year_pattern.search(file)
+            if match is None:
+                print(f"Error: Cannot tell the year of file '{file}'.")
+                continue
+            year = load_year(file_path, store)
+            if year is not None:
+                year["years"] = np.full(len(year["names"]), int(match.group(1)))
+                parts.append(year)
+        if not parts:
+            empty = np.empty(0)
+            return cls(empty, empty, empty, empty, empty, np.empty((0, len(months))), cell_size)
+        return cls(*(np.concatenate([part[key] for part in parts])
+                     for key in ("names", "stn_id", "lat", "lon", "years", "temps")), cell_size=cell_size)
+
+    def year_slice(self, years=None):
+        """Returns the (start, stop) row range of an inclusive (first, last) year range."""
+        if years is None:
+            return 0, len(self.years)
+        first, last = years
+        start = np.searchsorted(self.years, first, side="left") if first is not None else 0
+        stop = np.searchsorted(self.years, last, side="right") if last is not None else len(self.years)
+        return int(start), int(max(start, stop))
+
+    def select(self, years=None, lat_range=None, lon_range=None):
+        """
+        Returns the positions of the rows matching every given filter, in year order.
+
+        Parameters:
+            years (tuple): Inclusive (first, last) years; either end may be None.
+            lat_range (tuple): Inclusive (min, max) latitude; either end may be None.
+            lon_range (tuple): Inclusive (min, max) longitude; either end may be None.
+        """
+        start, stop = self.year_slice(years)
+        if lat_range is None and lon_range is None:
+            return np.arange(start, stop)
+
+        lat_min, lat_max = bounds(lat_range)
+        lon_min, lon_max = bounds(lon_range)
+        selected = []
+        for (lat_cell, lon_cell), rows in self.cells.items():
+            cell_lat_min, cell_lon_min = lat_cell * self.cell_size, lon_cell * self.cell_size
+            cell_lat_max, cell_lon_max = cell_lat_min + self.cell_size, cell_lon_min + self.cell_size
+            if cell_lat_max < lat_min or cell_lat_min > lat_max or cell_lon_max < lon_min or cell_lon_min > lon_max:
+                continue
+            rows = rows[np.searchsorted(rows, start):np.searchsorted(rows, stop)]
+            inside = (lat_min <= cell_lat_min and cell_lat_max <= lat_max
+                      and lon_min <= cell_lon_min and cell_lon_max <= lon_max)
+            if not inside:
+                # Cells on the edge of the range are checked row by row
+                lat, lon = self.lat[rows], self.lon[rows]
+                rows = rows[(lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)]
+            selected.append(rows)
+        if not selected:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(selected))
+
+    def aggregate(self, years=None, lat_range=None, lon_range=None):
+        """
+        Computes seasonal averages and per-station statistics over the selected rows.
+
+        Takes the same filters as select.
+
+        Returns:
+            tuple: (season_averages dict, station_stats DataFrame) as returned by Question2.aggregate,
+            or None if no readings match.
+        """
+        rows = self.select(years, lat_range, lon_range)
+        if len(rows) == 0:
+            return None
+        station_stats, season_stats = block_stats(self.names[rows], self.temps[rows])
+        if station_stats.empty:
+            return None
+        return aggregate(station_stats, season_stats)
+
+
+def bounds(value_range):
+    """Turns an optional (min, max) pair with optional ends into finite-or-infinite bounds."""
+    low, high = value_range if value_range is not None else (None, None)
+    return (low if low is not None else -math.inf), (high if high is not None else math.inf)
+
+
+def parse_years(text):
+    """Parses "1990-1995", "1990-", "-1995" or "1990" into an inclusive (first, last) pair."""
+    first, _, last = text.partition("-") if "-" in text else (text, "", text)
+    return (int(first) if first else None), (int(last) if last else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer filtered questions about the station temperatures.")
+    parser.add_argument("--years", type=parse_years, help="year or inclusive year range, e.g. 1990-1995")
+    parser.add_argument("--lat-min", type=float, help="southern latitude bound (degrees)")
+    parser.add_argument("--lat-max", type=float, help="northern latitude bound (degrees)")
+    parser.add_argument("--lon-min", type=float, help="western longitude bound (degrees)")
+    parser.add_argument("--lon-max", type=float, help="eastern longitude bound (degrees)")
+    parser.add_argument("--cell-size", type=float, default=5.0, help="grid cell size in degrees (default 5)")
+    parser.add_argument("--input", default=input_folder, help=f"folder holding the CSV files (default: {input_folder})")
+    parser.add_argument("--store", default=store_folder, help=f"binary store folder (default: {store_folder})")
+    parser.add_argument("--no-store", action="store_true", help="always parse the CSV files")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: Input folder '{args.input}' does not exist.")
+        return
+    csv_files = sorted(file for file in os.listdir(args.input) if file.endswith(".csv"))
+    index = StationIndex.from_files([os.path.join(args.input, file) for file in csv_files],
+                                    None if args.no_store else args.store, args.cell_size)
+
+    lat_range = None if args.lat_min is None and args.lat_max is None else (args.lat_min, args.lat_max)
+    lon_range = None if args.lon_min is None and args.lon_max is None else (args.lon_min, args.lon_max)
+    result = index.aggregate(args.years, lat_range, lon_range)
+    if result is None:
+        print("No readings match the given filters.")
+        return
+
+    season_averages, station_stats = result
+    print(f"Stations matched: {len(station_stats)}")
+    print("Average Seasonal Temperatures:")
+    for season in seasons:
+        print(f"{season}: {season_averages[season]}")
+    print("Station(s) with the Largest Temperature Range:")
+    print("\n".join(largest_range_stations(station_stats)))
+    warmest_stations, coolest_stations = warmest_and_coolest_stations(station_stats)
+    print("Warmest Station(s):")
+    print("\n".join(warmest_stations))
+    print("Coolest Station(s):")
+    print("\n".join(coolest_stations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# Bump when the layout of the stored files changes so old stores are rebuilt
+STORE_VERSION = 1
+
+# Default folder holding the binary copies of the CSV files
+store_folder = "temperature_store"
+
+
+def store_paths(csv_path, folder):
+    """Returns the (matrix, metadata) paths of the binary copy of a CSV file."""
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(folder, stem + ".npy"), os.path.join(folder, stem + ".json")
+
+
+def column_or_none(data, column):
+    """Returns a column as a list, or None if the CSV does not have it."""
+    return data[column].tolist() if column in data.columns else None
+
+
+def convert_csv(csv_path, folder, columns):
+    """
+    Packs one yearly CSV into a float64 station-by-month matrix plus a station dictionary.
+
+    The matrix is a .npy file with one row per station and one column per entry of columns
+    (NaN where a reading is missing). The JSON file next to it holds the station names, STN_ID,
+    LAT and LON of each row and the size and modification time of the CSV it was built from.
+    float64 is kept so results read from the store are identical to the CSV path.
+
+    Parameters:
+        csv_path (str): Path to a stations_group_YYYY.csv file.
+        folder (str): Folder the binary files are written to.
+        columns (list): Month columns, in the order they are stored.
+
+    Returns:
+        bool: True if the file was converted.
+    """
+    file = os.path.basename(csv_path)
+    try:
+        info = os.stat(csv_path)
+        data = pd.read_csv(csv_path)
+    except Exception as e:
+        print(f"Error reading file '{file}': {e}")
+        return False
+    if "STATION_NAME" not in data.columns:
+        print(f"Error: File '{file}' is missing required columns.")
+        return False
+
+    temps = data.reindex(columns=columns).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    meta = {
+        "version": STORE_VERSION,
+        "source_size": info.st_size,
+        "source_mtime_ns": info.st_mtime_ns,
+        "columns": list(columns),
+        "station_name": data["STATION_NAME"].tolist(),
+        "stn_id": column_or_none(data, "STN_ID"),
+        "lat": column_or_none(data, "LAT"),
+        "lon": column_or_none(data, "LON"),
+    }
+
+    os.makedirs(folder, exist_ok=True)
+    matrix_path, meta_path = store_paths(csv_path, folder)
+    # Write the matrix first: the metadata marks the pair as complete
+    np.save(matrix_path, np.ascontiguousarray(temps))
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+    return True
+
+
+def open_store(csv_path, folder, columns):
+    """
+    Opens the binary copy of a CSV file as a read-only memory map.
+
+    The CSV stays the source of truth: the copy is only used when it was built from a file with
+    the same size and modification time and with the same month columns.
+
+    Parameters:
+        csv_path (str): Path to a stations_group_YYYY.csv file.
+        folder (str): Folder holding the binary files.
+        columns (list): Month columns the caller expects, in order.
+
+    Returns:
+        tuple: (meta dict, temps memory-mapped ndarray), or None if there is no up-to-date copy.
+    """
+    matrix_path, meta_path = store_paths(csv_path, folder)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        info = os.stat(csv_path)
+        if (meta.get("version") != STORE_VERSION or meta["columns"] != list(columns)
+                or meta["source_size"] != info.st_size or meta["source_mtime_ns"] != info.st_mtime_ns):
+            return None
+        temps = np.load(matrix_path, mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        return None
+    if temps.shape != (len(meta["station_name"]), len(columns)):
+        return None
+    return meta, temps
+
+
+def build_store(csv_folder, folder, columns, force=False):
+    """
+    Converts every CSV in csv_folder whose binary copy is missing or out of date.
+
+    Parameters:
+        csv_folder (str): Folder holding the stations_group_YYYY.csv files.
+        folder (str): Folder the binary files are written to.
+        columns (list): Month columns, in the order they are stored.
+        force (bool): Rebuild every file even if its copy is up to date.
+
+    Returns:
+        tuple: (converted, up_to_date) file counts.
+    """
+    converted = up_to_date = 0
+    for file in sorted(os.listdir(csv_folder)):
+        if not file.endswith(".csv"):
+            continue
+        csv_path = os.path.join(csv_folder, file)
+        if not force and open_store(csv_path, folder, columns) is not None:
+            up_to_date += 1
+            continue
+        print(f"Converting file: {file}")
+        if convert_csv(csv_path, folder, columns):
+            converted += 1
+    return converted, up_to_date
+
+
+def main():
+    # Imported here because Question2 itself reads from the store
+    from Question2 import input_folder, months
+
+    parser = argparse.ArgumentParser(description="Pack the yearly temperature CSV files into memory-mappable binary files.")
+    parser.add_argument("--input", default=input_folder, help=f"folder holding the CSV files (default: {input_folder})")
+    parser.add_argument("--store", default=store_folder, help=f"folder for the binary files (default: {store_folder})")
+    parser.add_argument("--force", action="store_true", help="rebuild files that are already up to date")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: Input folder '{args.input}' does not exist.")
+        return
+    converted, up_to_date = build_store(args.input, args.store, months, args.force)
+    print(f"Converted {converted} file(s), {up_to_date} already up to date.")
+
+
+if __name__ == "__main__":
+    main()
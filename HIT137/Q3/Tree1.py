@@ -1,5 +1,11 @@
+import argparse
 import turtle
 import random
+from tree_export import PALETTE
+from tree_geometry import branch_count, check_parameters, tree_segments, visible_depth
+
+# Colors picked at random for each branch
+COLORS = list(PALETTE)
 
 def draw_branch(t, branch_length, left_angle, right_angle, depth, reduction_factor):
     """
@@ -17,7 +23,7 @@ def draw_branch(t, branch_length, left_angle, right_angle, depth, reduction_fact
         return
 
     # Set a random color for the branch
-    t.color(random.choice(["red", "green", "blue", "orange", "purple", "yellow", "pink"]))
+    t.color(random.choice(COLORS))
 
     # Draw the current branch
     t.forward(branch_length)
@@ -34,25 +40,46 @@ def draw_branch(t, branch_length, left_angle, right_angle, depth, reduction_fact
     t.left(right_angle)
     t.backward(branch_length)
 
+def draw_segments(screen, segments):
+    """
+    Draws precomputed branches straight onto the turtle canvas as batched line items.
+
+    Screen updates are switched off while the lines are added and the canvas is refreshed
+    once at the end, instead of animating every forward/left/right call.
+
+    Parameters:
+        screen (turtle.TurtleScreen): The screen to draw on.
+        segments (iterable): (x1, y1, x2, y2, level) tuples from tree_geometry.
+
+    Returns:
+        int: Number of branches drawn.
+    """
+    canvas = screen.getcanvas()
+    xscale, yscale = screen.xscale, screen.yscale
+    screen.tracer(0)
+    count = 0
+    for x1, y1, x2, y2, _ in segments:
+        # Turtle coordinates have y pointing up; the canvas has y pointing down
+        canvas.create_line(x1 * xscale, -y1 * yscale, x2 * xscale, -y2 * yscale,
+                           fill=random.choice(COLORS), capstyle="round")
+        count += 1
+    screen.update()
+    return count
+
 def main():
+    parser = argparse.ArgumentParser(description="Draw a recursive colorful tree.")
+    parser.add_argument("--min-length", type=float, default=1.0,
+                        help="skip branches shorter than this many pixels (default 1, 0 draws every branch)")
+    args = parser.parse_args()
+
     try:
         # Take user inputs with validation
         left_angle = float(input("Enter the left branch angle (in degrees): "))
         right_angle = float(input("Enter the right branch angle (in degrees): "))
         branch_length = float(input("Enter the starting branch length (in pixels): "))
-        
-        if branch_length <= 0:
-            raise ValueError("Branch length must be greater than 0.")
-
         depth = int(input("Enter the recursion depth: "))
-        
-        if depth < 0:
-            raise ValueError("Recursion depth cannot be negative.")
-
         reduction_factor = float(input("Enter the branch length reduction factor (e.g., 0.7): "))
-        
-        if not (0 < reduction_factor < 1):
-            raise ValueError("Reduction factor must be between 0 and 1 (exclusive).")
+        check_parameters(branch_length, depth, reduction_factor)
 
     except ValueError as e:
         print(f"Input error: {e}")
@@ -63,16 +90,15 @@ def main():
     screen.setup(width=800, height=600)
     screen.title("Recursive Colorful Tree Pattern")
 
-    t = turtle.Turtle()
-    t.speed(0)  # Set the turtle speed to the fastest
-    t.left(90)  # Point the turtle upwards
-    t.penup()
-    t.goto(0, -250)  # Start near the bottom of the screen
-    t.pendown()
-
-    # Draw the tree
+    # Draw the tree, starting near the bottom of the screen and pointing upwards.
+    # The canvas keeps every line anyway, so the tree may come from the geometry cache.
     try:
-        draw_branch(t, branch_length, left_angle, right_angle, depth, reduction_factor)
+        segments = tree_segments(branch_length, left_angle, right_angle, depth, reduction_factor,
+                                 start=(0, -250), heading=90, min_length=args.min_length, cache=True)
+        drawn = draw_segments(screen, segments)
+        culled = branch_count(depth) - branch_count(visible_depth(branch_length, depth, reduction_factor,
+                                                                  args.min_length))
+        print(f"Drew {drawn} branches ({culled} shorter than {args.min_length:g} px skipped).")
     except Exception as e:
         print(f"An error occurred while drawing: {e}")
 
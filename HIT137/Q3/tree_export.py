@@ -0,0 +1,154 @@
+import argparse
+import random
+import struct
+import zlib
+from tree_geometry import branch_count, check_parameters, tree_segments
+
+# Branch colors with the RGB values Tk uses for these names, so exports match the turtle window
+PALETTE = {
+    "red": (255, 0, 0),
+    "green": (0, 255, 0),
+    "blue": (0, 0, 255),
+    "orange": (255, 165, 0),
+    "purple": (160, 32, 240),
+    "yellow": (255, 255, 0),
+    "pink": (255, 192, 203),
+}
+
+
+def write_svg(path, segments, width=800, height=600, background="white"):
+    """
+    Streams branches into an SVG file, one <line> element per branch.
+
+    Segments are written as they arrive, so a generator from iter_segments keeps memory
+    independent of the number of branches. Coordinates are turtle coordinates: the origin is
+    the centre of the image and y points up.
+
+    Parameters:
+        path (str): Output .svg file.
+        segments (iterable): (x1, y1, x2, y2, level) tuples.
+        width (int): Image width in pixels.
+        height (int): Image height in pixels.
+        background (str): SVG background color.
+
+    Returns:
+        int: Number of branches written.
+    """
+    names = list(PALETTE)
+    hex_colors = {name: "#%02x%02x%02x" % rgb for name, rgb in PALETTE.items()}
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+                f'viewBox="{-width / 2:g} {-height / 2:g} {width} {height}">\n')
+        f.write(f'<rect x="{-width / 2:g}" y="{-height / 2:g}" width="{width}" height="{height}" '
+                f'fill="{background}"/>\n')
+        f.write('<g stroke-width="1" stroke-linecap="round">\n')
+        for x1, y1, x2, y2, _ in segments:
+            # SVG has y pointing down
+            f.write(f'<line x1="{x1:.2f}" y1="{-y1:.2f}" x2="{x2:.2f}" y2="{-y2:.2f}" '
+                    f'stroke="{hex_colors[random.choice(names)]}"/>\n')
+            count += 1
+        f.write("</g>\n</svg>\n")
+    return count
+
+
+def draw_line(pixels, width, height, x1, y1, x2, y2, rgb):
+    """Draws a one-pixel line into an RGB bytearray with Bresenham's algorithm, clipping to the image."""
+    dx, dy = abs(x2 - x1), -abs(y2 - y1)
+    step_x = 1 if x1 < x2 else -1
+    step_y = 1 if y1 < y2 else -1
+    error = dx + dy
+    while True:
+        if 0 <= x1 < width and 0 <= y1 < height:
+            offset = (y1 * width + x1) * 3
+            pixels[offset:offset + 3] = rgb
+        if x1 == x2 and y1 == y2:
+            return
+        double_error = 2 * error
+        if double_error >= dy:
+            error += dy
+            x1 += step_x
+        if double_error <= dx:
+            error += dx
+            y1 += step_y
+
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def write_png(path, segments, width=800, height=600, background=(255, 255, 255)):
+    """
+    Rasterizes branches into an RGB image and saves it as a PNG, using only the standard library.
+
+    Only the width x height pixel buffer is kept in memory; segments are drawn as they arrive.
+
+    Parameters:
+        path (str): Output .png file.
+        segments (iterable): (x1, y1, x2, y2, level) tuples in turtle coordinates.
+        width (int): Image width in pixels.
+        height (int): Image height in pixels.
+        background (tuple): RGB background color.
+
+    Returns:
+        int: Number of branches drawn.
+    """
+    names = list(PALETTE)
+    colors = {name: bytes(rgb) for name, rgb in PALETTE.items()}
+    pixels = bytearray(bytes(background) * (width * height))
+    centre_x, centre_y = width / 2, height / 2
+    count = 0
+    for x1, y1, x2, y2, _ in segments:
+        draw_line(pixels, width, height, round(centre_x + x1), round(centre_y - y1),
+                  round(centre_x + x2), round(centre_y - y2), colors[random.choice(names)])
+        count += 1
+
+    # Each PNG row starts with a filter byte (0 = none)
+    stride = width * 3
+    raw = b"".join(b"\x00" + pixels[row * stride:(row + 1) * stride] for row in range(height))
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(png_chunk(b"IDAT", zlib.compress(bytes(raw), 6)))
+        f.write(png_chunk(b"IEND", b""))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the recursive tree to SVG or PNG without a display.")
+    parser.add_argument("output", help="output file ending in .svg or .png")
+    parser.add_argument("--left-angle", type=float, required=True, help="left branch angle (in degrees)")
+    parser.add_argument("--right-angle", type=float, required=True, help="right branch angle (in degrees)")
+    parser.add_argument("--length", type=float, required=True, help="starting branch length (in pixels)")
+    parser.add_argument("--depth", type=int, required=True, help="recursion depth")
+    parser.add_argument("--reduction", type=float, required=True, help="branch length reduction factor (e.g., 0.7)")
+    parser.add_argument("--width", type=int, default=800, help="image width in pixels (default 800)")
+    parser.add_argument("--height", type=int, default=600, help="image height in pixels (default 600)")
+    parser.add_argument("--seed", type=int, help="seed for the random branch colors")
+    parser.add_argument("--min-length", type=float, default=1.0,
+                        help="skip branches shorter than this many pixels (default 1, 0 keeps every branch)")
+    args = parser.parse_args()
+
+    try:
+        check_parameters(args.length, args.depth, args.reduction)
+    except ValueError as e:
+        print(f"Input error: {e}")
+        return
+
+    random.seed(args.seed)
+    # Same starting point as the turtle window: near the bottom, pointing upwards
+    segments = tree_segments(args.length, args.left_angle, args.right_angle, args.depth, args.reduction,
+                             start=(0, -250), heading=90, min_length=args.min_length)
+    if args.output.lower().endswith(".png"):
+        count = write_png(args.output, segments, args.width, args.height)
+    elif args.output.lower().endswith(".svg"):
+        count = write_svg(args.output, segments, args.width, args.height)
+    else:
+        print("Input error: Output file must end in .svg or .png.")
+        return
+    culled = branch_count(args.depth) - count
+    print(f"Wrote {count} branches to {args.output} ({culled} shorter than {args.min_length:g} px skipped)")
+
+
+if __name__ == "__main__":
+    main()
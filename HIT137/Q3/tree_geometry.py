@@ -0,0 +1,124 @@
+import math
+from functools import lru_cache
+import numpy as np
+
+# Deepest tree whose geometry is kept in the cache (2**18 - 1 branches, about 8.5 MB)
+CACHE_MAX_DEPTH = 18
+
+
+def iter_segments(branch_length, left_angle, right_angle, depth, reduction_factor,
+                  start=(0.0, -250.0), heading=90.0):
+    """
+    Yields the branches of the tree without recursion, in the order draw_branch draws them.
+
+    An explicit stack holds the branches still to be drawn, so memory grows with the depth of the
+    tree rather than with the number of branches.
+
+    Parameters:
+        branch_length (float): Length of the trunk.
+        left_angle (float): Angle to turn left for left branches.
+        right_angle (float): Angle to turn right for right branches.
+        depth (int): Number of levels to draw.
+        reduction_factor (float): Factor by which branch length is reduced at each level.
+        start (tuple): (x, y) position of the base of the trunk.
+        heading (float): Direction of the trunk in degrees (90 points up).
+
+    Yields:
+        tuple: (x1, y1, x2, y2, level) for each branch, level 0 being the trunk.
+    """
+    stack = [(start[0], start[1], heading, branch_length, 0)] if depth > 0 else []
+    while stack:
+        x, y, angle, length, level = stack.pop()
+        radians = math.radians(angle)
+        end_x = x + length * math.cos(radians)
+        end_y = y + length * math.sin(radians)
+        yield x, y, end_x, end_y, level
+
+        if level + 1 < depth:
+            child_length = length * reduction_factor
+            # Right is pushed first so the left subtree comes out first, as in draw_branch
+            stack.append((end_x, end_y, angle - right_angle, child_length, level + 1))
+            stack.append((end_x, end_y, angle + left_angle, child_length, level + 1))
+
+
+def visible_depth(branch_length, depth, reduction_factor, min_length=0.0):
+    """
+    Returns how many levels of the tree are at least min_length long.
+
+    Every branch of a level has the same length, so culling branches shorter than min_length
+    (level-of-detail pruning) is the same as drawing fewer levels.
+    """
+    levels = 0
+    while levels < depth and branch_length * reduction_factor ** levels >= min_length:
+        levels += 1
+    return levels
+
+
+def branch_count(depth):
+    """Number of branches in a full tree of the given depth."""
+    return 2 ** depth - 1 if depth > 0 else 0
+
+
+@lru_cache(maxsize=4)
+def unit_tree(left_angle, right_angle, reduction_factor, depth, heading=90.0):
+    """
+    Computes and caches the geometry of a tree with a trunk of length 1 starting at the origin.
+
+    Trees that only differ in trunk length and position are scaled and shifted copies of this one,
+    so redrawing a tree reuses it instead of repeating the trigonometry. The tree is built a whole
+    level at a time with NumPy, then put in the order iter_segments yields the branches.
+
+    Returns:
+        tuple: (coords, levels) NumPy arrays; coords has a row x1, y1, x2, y2 per branch.
+    """
+    count = branch_count(depth)
+    coords = np.empty((count, 4))
+    levels = np.empty(count, dtype=np.uint8)
+    x = np.zeros(1)
+    y = np.zeros(1)
+    angle = np.full(1, float(heading))
+    position = np.zeros(1, dtype=np.int64) # Index of each branch of the level in drawing order
+    length = 1.0
+    for level in range(depth):
+        radians = np.radians(angle)
+        end_x = x + length * np.cos(radians)
+        end_y = y + length * np.sin(radians)
+        coords[position] = np.column_stack((x, y, end_x, end_y))
+        levels[position] = level
+
+        # Children alternate left, right; a right child follows the whole left subtree
+        x, y = np.repeat(end_x, 2), np.repeat(end_y, 2)
+        angle = np.column_stack((angle + left_angle, angle - right_angle)).ravel()
+        position = np.column_stack((position + 1, position + 1 + branch_count(depth - level - 1))).ravel()
+        length *= reduction_factor
+    return coords, levels
+
+
+def tree_segments(branch_length, left_angle, right_angle, depth, reduction_factor,
+                  start=(0.0, -250.0), heading=90.0, min_length=0.0, cache=False):
+    """
+    Yields every branch of the tree that is at least min_length long, as (x1, y1, x2, y2, level).
+
+    By default the branches are streamed from iter_segments, so they never have to fit in memory.
+    With cache=True, trees up to CACHE_MAX_DEPTH levels are scaled from the unit_tree cache
+    instead, which is faster but holds the whole tree.
+    """
+    depth = visible_depth(branch_length, depth, reduction_factor, min_length)
+    if not cache or depth > CACHE_MAX_DEPTH:
+        yield from iter_segments(branch_length, left_angle, right_angle, depth, reduction_factor, start, heading)
+        return
+
+    coords, levels = unit_tree(left_angle, right_angle, reduction_factor, depth, heading)
+    x0, y0 = start
+    scaled = coords * branch_length + (x0, y0, x0, y0)
+    yield from zip(*scaled.T.tolist(), levels.tolist())
+
+
+def check_parameters(branch_length, depth, reduction_factor):
+    """Raises ValueError with the same messages as Tree1's prompts if a parameter is out of range."""
+    if branch_length <= 0:
+        raise ValueError("Branch length must be greater than 0.")
+    if depth < 0:
+        raise ValueError("Recursion depth cannot be negative.")
+    if not (0 < reduction_factor < 1):
+        raise ValueError("Reduction factor must be between 0 and 1 (exclusive).")
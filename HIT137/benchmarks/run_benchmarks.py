@@ -0,0 +1,339 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module; peak memory then comes from tracemalloc
+    resource = None
+
+# The assignment folders are plain script directories, so make their modules importable
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, "..", "Q1"), os.path.join(HERE, "..", "Q2")]
+
+SIZE_UNITS = {"": 1, "B": 1, "K": 1 << 10, "KB": 1 << 10, "M": 1 << 20, "MB": 1 << 20, "G": 1 << 30, "GB": 1 << 30}
+
+MONTHS = ["January", "February", "March", "April", "May", "June",
+          "July", "August", "September", "October", "November", "December"]
+
+
+def parse_size(text):
+    """Parses sizes such as "512K", "1MB" or "1G" (binary units) into bytes."""
+    text = text.strip().upper()
+    digits = text.rstrip("KMGB")
+    return int(float(digits) * SIZE_UNITS[text[len(digits):]])
+
+
+def format_size(size):
+    """Formats a byte count with the largest whole binary unit, e.g. 1048576 -> "1MB"."""
+    for unit in ("GB", "MB", "KB"):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process and its finished children, in MB (Linux reports KB).
+
+    Without the resource module this is the peak of the Python allocations tracemalloc has seen,
+    which leaves out memory the interpreter itself uses.
+    """
+    if resource is None:
+        return round(tracemalloc.get_traced_memory()[1] / (1 << 20), 1)
+    scale = 1 / (1 << 20) if sys.platform == "darwin" else 1 / (1 << 10)
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) * scale, 1)
+
+
+# Synthetic inputs
+
+def write_text(path, size, seed=0):
+    """Writes size bytes of mixed-case UTF-8 text by repeating a 1 MB random block."""
+    rng = random.Random(seed)
+    words = ["the", "Quick", "brown", "FOX", "jumps", "over", "lazy", "Dog", "naïve", "café", "Zebra", "mañana"]
+    block = []
+    length = 0
+    while length < min(size, 1 << 20):
+        word = rng.choice(words) + rng.choice(" .,\n")
+        block.append(word)
+        length += len(word.encode("utf-8"))
+    block = "".join(block).encode("utf-8")
+    with open(path, "wb") as f:
+        written = 0
+        while written < size:
+            piece = block[:size - written]
+            f.write(piece)
+            written += len(piece)
+
+
+def write_station_files(folder, stations, years, seed=0):
+    """Writes years files shaped like stations_group_YYYY.csv with stations rows each; returns their paths."""
+    rng = random.Random(seed)
+    coordinates = [(rng.uniform(-43.0, -10.0), rng.uniform(113.0, 154.0)) for _ in range(stations)]
+    paths = []
+    for year in range(1986, 1986 + years):
+        path = os.path.join(folder, f"stations_group_{year}.csv")
+        with open(path, "w") as f:
+            f.write("STATION_NAME,STN_ID,LAT,LON," + ",".join(MONTHS) + "\n")
+            for station, (lat, lon) in enumerate(coordinates):
+                base = 35.0 + lat * 0.5
+                readings = ["" if rng.random() < 0.01 else f"{base + rng.uniform(-8.0, 8.0):.2f}" for _ in MONTHS]
+                f.write(f"STATION-{station:06d},{10000 + station},{lat:.2f},{lon:.2f}," + ",".join(readings) + "\n")
+        paths.append(path)
+    return paths
+
+
+# Benchmark cases: each prepares its input untimed and returns the seconds spent in the engine itself
+
+def cipher_case(engine, input_path, work_dir, n, m, workers):
+    import encryption
+
+    output_path = os.path.join(work_dir, f"{engine}.out")
+    if engine == "reference":
+        text = open(input_path, encoding="utf-8", errors="replace").read()
+        start = time.perf_counter()
+        encryption.encrypt_reference(text, n, m)
+    elif engine == "translate-str":
+        text = open(input_path, encoding="utf-8", errors="replace").read()
+        start = time.perf_counter()
+        encryption.encrypt(text, n, m)
+    elif engine == "translate-bytes":
+        data = open(input_path, "rb").read()
+        start = time.perf_counter()
+        encryption.encrypt_bytes(data, n, m)
+    elif engine == "stream-file":
+        start = time.perf_counter()
+        with open(input_path, "rb") as src, open(output_path, "wb") as dst:
+            encryption.encrypt_stream(src, dst, n, m)
+    elif engine == "parallel-file":
+        start = time.perf_counter()
+        encryption.parallel_encrypt_file(input_path, output_path, n, m, workers)
+    elif engine == "verify-stream":
+        # n = m = 13 maps every letter to itself, so the whole file is compared instead of stopping early
+        with open(input_path, "rb") as src, open(output_path, "wb") as dst:
+            encryption.encrypt_stream(src, dst, 13, 13)
+        start = time.perf_counter()
+        encryption.verify_files(input_path, output_path, 13, 13)
+    else:
+        raise ValueError(f"unknown cipher engine '{engine}'")
+    return time.perf_counter() - start
+
+
+def aggregation_case(engine, file_paths, work_dir, workers):
+    import Question2
+    from partial_cache import PartialCache
+    from station_index import StationIndex
+    from temperature_store import build_store
+
+    store = os.path.join(work_dir, "store")
+    cache_path = os.path.join(work_dir, "cache", "partials.pkl")
+    if engine == "store":
+        build_store(os.path.dirname(file_paths[0]), store, Question2.months)
+    elif engine == "cache-warm":
+        cache = PartialCache(cache_path)
+        Question2.accumulate(file_paths, cache=cache)
+        cache.save()
+
+    start = time.perf_counter()
+    if engine == "csv-serial":
+        Question2.accumulate(file_paths)
+    elif engine == "csv-workers":
+        Question2.accumulate(file_paths, workers)
+    elif engine == "csv-chunked":
+        Question2.accumulate(file_paths, chunk_rows=1000)
+    elif engine == "store":
+        Question2.accumulate(file_paths, store=store)
+    elif engine == "cache-warm":
+        Question2.accumulate(file_paths, cache=PartialCache(cache_path))
+    elif engine == "index-query":
+        index = StationIndex.from_files(file_paths)
+        middle = 1986 + len(file_paths) // 4
+        index.aggregate(years=(middle, middle + len(file_paths) // 2), lat_range=(None, -30.0))
+    else:
+        raise ValueError(f"unknown aggregation engine '{engine}'")
+    return time.perf_counter() - start
+
+
+def run_isolated(function, args, queue):
+    """Runs one case with stdout silenced and reports (seconds, peak RSS) or the error through queue."""
+    if resource is None:
+        tracemalloc.start()
+    try:
+        with open(os.devnull, "w") as devnull:
+            saved = os.dup(1)
+            os.dup2(devnull.fileno(), 1)
+            try:
+                with contextlib.redirect_stdout(devnull):
+                    seconds = function(*args)
+            finally:
+                os.dup2(saved, 1)
+                os.close(saved)
+        queue.put((seconds, peak_rss_mb(), None))
+    except Exception as e:
+        queue.put((None, peak_rss_mb(), f"{type(e).__name__}: {e}"))
+
+
+def wait_result(process, results, timeout):
+    """
+    Waits for the report of a case process; a process that dies without one (for example killed
+    by the out-of-memory killer) or runs longer than timeout seconds becomes an error.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            pass
+        if not process.is_alive():
+            try:
+                return results.get(timeout=1)  # Reported just before exiting
+            except queue.Empty:
+                process.join()
+                return None, peak_rss_mb(), f"process exited with code {process.exitcode} without a result"
+        if deadline is not None and time.monotonic() > deadline:
+            process.terminate()
+            process.join()
+            return None, peak_rss_mb(), f"timed out after {timeout} s"
+
+
+def measure(function, args, repeat, timeout=None):
+    """
+    Times a case in a fresh process per repetition, so peak RSS belongs to that case alone.
+
+    Returns:
+        tuple: (best seconds, largest peak RSS in MB, error message or None)
+    """
+    best = None
+    peak = 0.0
+    for _ in range(repeat):
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=run_isolated, args=(function, args, results))
+        process.start()
+        seconds, rss, error = wait_result(process, results, timeout)
+        process.join()
+        peak = max(peak, rss)
+        if error is not None:
+            return None, peak, error
+        best = seconds if best is None else min(best, seconds)
+    return best, peak, None
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Prints the speed of each case relative to a previous results file."""
+    with open(baseline_path) as f:
+        baseline = {(r["suite"], r["engine"], r["input"]): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        old = baseline.get((result["suite"], result["engine"], result["input"]))
+        if old and old.get("seconds") and result.get("seconds"):
+            ratio = old["seconds"] / result["seconds"]
+            print(f"  {result['suite']:<12} {result['engine']:<16} {result['input']:<16} {ratio:6.2f}x "
+                  f"{'faster' if ratio >= 1 else 'slower'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Q1 cipher and the Q2 temperature aggregation.")
+    parser.add_argument("--suite", choices=["all", "cipher", "aggregation"], default="all")
+    parser.add_argument("--text-sizes", default="1MB,16MB",
+                        help="comma-separated text sizes for the cipher, e.g. 1MB,64MB,1GB (default 1MB,16MB)")
+    parser.add_argument("--cipher-engines", default="reference,translate-str,translate-bytes,stream-file,"
+                                                    "parallel-file,verify-stream")
+    parser.add_argument("--reference-max", type=parse_size, default=parse_size("4MB"),
+                        help="skip the per-character reference cipher above this size (default 4MB)")
+    parser.add_argument("--stations", default="200", help="comma-separated station counts (default 200)")
+    parser.add_argument("--years", default="20", help="comma-separated year counts (default 20)")
+    parser.add_argument("--aggregation-engines", default="csv-serial,csv-workers,csv-chunked,store,cache-warm,"
+                                                         "index-query")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="workers for the parallel engines")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the fastest is kept (default 3)")
+    parser.add_argument("--timeout", type=float, default=0,
+                        help="seconds after which a run is stopped and reported as an error (default: no limit)")
+    parser.add_argument("-n", type=int, default=3, help="cipher key n (default 3)")
+    parser.add_argument("-m", type=int, default=4, help="cipher key m (default 4)")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--compare", help="previous JSON results file to compare against")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="hit137-bench-") as work_dir:
+        if args.suite in ("all", "cipher"):
+            for size in map(parse_size, args.text_sizes.split(",")):
+                input_path = os.path.join(work_dir, f"text_{size}.txt")
+                write_text(input_path, size)
+                for engine in args.cipher_engines.split(","):
+                    if engine == "reference" and size > args.reference_max:
+                        continue
+                    seconds, rss, error = measure(cipher_case, (engine, input_path, work_dir, args.n, args.m,
+                                                                args.workers), args.repeat, args.timeout)
+                    result = {"suite": "cipher", "engine": engine, "input": format_size(size), "bytes": size,
+                              "seconds": seconds, "peak_rss_mb": rss, "error": error,
+                              "mb_per_s": round(size / (1 << 20) / seconds, 2) if seconds else None}
+                    results.append(result)
+                    print(f"cipher       {engine:<16} {format_size(size):<16} "
+                          + (f"{result['mb_per_s']:10.2f} MB/s  peak {rss:8.1f} MB" if seconds else f"error: {error}"))
+                os.remove(input_path)
+
+        if args.suite in ("all", "aggregation"):
+            for stations in map(int, args.stations.split(",")):
+                for years in map(int, args.years.split(",")):
+                    data_dir = tempfile.mkdtemp(dir=work_dir)
+                    csv_dir = os.path.join(data_dir, "temperature_data")
+                    os.makedirs(csv_dir)
+                    file_paths = write_station_files(csv_dir, stations, years)
+                    csv_bytes = sum(os.path.getsize(path) for path in file_paths)
+                    label = f"{stations}x{years}"
+                    for engine in args.aggregation_engines.split(","):
+                        case_dir = tempfile.mkdtemp(dir=data_dir)
+                        seconds, rss, error = measure(aggregation_case, (engine, file_paths, case_dir, args.workers),
+                                                      args.repeat, args.timeout)
+                        rows = stations * years
+                        result = {"suite": "aggregation", "engine": engine, "input": label, "rows": rows,
+                                  "bytes": csv_bytes, "seconds": seconds, "peak_rss_mb": rss, "error": error,
+                                  "rows_per_s": round(rows / seconds, 1) if seconds else None,
+                                  "mb_per_s": round(csv_bytes / (1 << 20) / seconds, 2) if seconds else None}
+                        results.append(result)
+                        print(f"aggregation  {engine:<16} {label:<16} "
+                              + (f"{result['rows_per_s']:10.0f} rows/s  {result['mb_per_s']:8.2f} MB/s  "
+                                 f"peak {rss:8.1f} MB" if seconds else f"error: {error}"))
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "workers": args.workers,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()